@@ -0,0 +1,42 @@
+"""make token numbers unique per doctor and day
+
+Revision ID: 1d4d22ad93ca
+Revises: 8134e989790d
+Create Date: 2026-10-18 10:02:36.817204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1d4d22ad93ca'
+down_revision: Union[str, Sequence[str], None] = '8134e989790d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Highest number handed out by the database fallback; Redis must be
+    # pushed past it before it reserves numbers again (see token_sequencer).
+    op.add_column(
+        'token_sequences',
+        sa.Column('fallback_number', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+    # Last line of defence against a number being issued twice. Fails if the
+    # table already holds duplicates; those need to be renumbered by hand.
+    op.create_index(
+        'ux_tokens_doctor_id_day_token_number', 'tokens',
+        ['doctor_id', sa.text('(created_at::date)'), 'token_number'],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ux_tokens_doctor_id_day_token_number', table_name='tokens')
+    op.drop_column('token_sequences', 'fallback_number')
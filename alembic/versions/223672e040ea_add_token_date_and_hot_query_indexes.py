@@ -0,0 +1,73 @@
+"""add token_date and hot query indexes
+
+Revision ID: 223672e040ea
+Revises: 1d4d22ad93ca
+Create Date: 2026-10-18 11:04:17.530192
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '223672e040ea'
+down_revision: Union[str, Sequence[str], None] = '1d4d22ad93ca'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tokens', sa.Column('token_date', sa.Date(), nullable=True))
+    op.execute("UPDATE tokens SET token_date = COALESCE(created_at, now() AT TIME ZONE 'utc')::date")
+    op.alter_column(
+        'tokens', 'token_date',
+        nullable=False,
+        server_default=sa.text("(now() AT TIME ZONE 'utc')::date"),
+    )
+
+    # Build indexes without blocking token issuance on a live table
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_tokens_doctor_id_token_date_created_at', 'tokens',
+            ['doctor_id', 'token_date', 'created_at'],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_tokens_token_date_status', 'tokens',
+            ['token_date', 'status'],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_tokens_active_token_date_created_at', 'tokens',
+            ['token_date', 'created_at'],
+            postgresql_where=sa.text("status <> 'completed'"),
+            postgresql_concurrently=True,
+        )
+        # Same rule as before, keyed on token_date instead of created_at
+        op.create_index(
+            'ux_tokens_doctor_id_token_date_token_number', 'tokens',
+            ['doctor_id', 'token_date', 'token_number'],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ux_tokens_doctor_id_day_token_number', table_name='tokens',
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        'ux_tokens_doctor_id_day_token_number', 'tokens',
+        ['doctor_id', sa.text('(created_at::date)'), 'token_number'],
+        unique=True,
+    )
+    op.drop_index('ux_tokens_doctor_id_token_date_token_number', table_name='tokens')
+    op.drop_index('ix_tokens_active_token_date_created_at', table_name='tokens')
+    op.drop_index('ix_tokens_token_date_status', table_name='tokens')
+    op.drop_index('ix_tokens_doctor_id_token_date_created_at', table_name='tokens')
+    op.drop_column('tokens', 'token_date')
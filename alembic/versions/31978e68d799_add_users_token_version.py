@@ -0,0 +1,31 @@
+"""add users.token_version
+
+Revision ID: 31978e68d799
+Revises: a77aa14fb4ae
+Create Date: 2026-10-18 15:21:08.640913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '31978e68d799'
+down_revision: Union[str, Sequence[str], None] = 'a77aa14fb4ae'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'users',
+        sa.Column('token_version', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'token_version')
@@ -0,0 +1,88 @@
+"""add patient lookup indexes
+
+Revision ID: 31c0256b6fec
+Revises: 71a1e1e866f3
+Create Date: 2026-10-18 15:18:57.402113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '31c0256b6fec'
+down_revision: Union[str, Sequence[str], None] = '71a1e1e866f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+EMAIL_NORMALIZED = "NULLIF(lower(btrim(email)), '')"
+PHONE_NORMALIZED = "NULLIF(regexp_replace(phone, '\\D', '', 'g'), '')"
+
+
+def _duplicates(column: str, normalized: str) -> list:
+    """Patients sharing a normalized email/phone, one line per group."""
+    rows = op.get_bind().execute(sa.text(f"""
+        SELECT {normalized} AS value, array_agg(id::text ORDER BY id) AS ids
+        FROM patients
+        WHERE {normalized} IS NOT NULL
+        GROUP BY 1
+        HAVING count(*) > 1
+        ORDER BY 1
+    """))
+    return [f"  {column} {row.value!r}: {', '.join(row.ids)}" for row in rows]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Existing duplicates would block the unique indexes. They are patient
+    # records (with their own tokens) and have to be merged by hand.
+    conflicts = _duplicates('email', EMAIL_NORMALIZED) + _duplicates('phone', PHONE_NORMALIZED)
+    if conflicts:
+        raise RuntimeError(
+            "Patients share an email or phone once normalized; merge them "
+            "and run the migration again:\n" + "\n".join(conflicts)
+        )
+
+    op.add_column('patients', sa.Column(
+        'email_normalized', sa.String(), sa.Computed(EMAIL_NORMALIZED, persisted=True), nullable=True,
+    ))
+    op.add_column('patients', sa.Column(
+        'phone_normalized', sa.String(), sa.Computed(PHONE_NORMALIZED, persisted=True), nullable=True,
+    ))
+
+    # Build indexes without blocking registrations on a live table
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ux_patients_email_normalized', 'patients', ['email_normalized'],
+            unique=True,
+            postgresql_ops={'email_normalized': 'text_pattern_ops'},
+            postgresql_where=sa.text('email_normalized IS NOT NULL'),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ux_patients_phone_normalized', 'patients', ['phone_normalized'],
+            unique=True,
+            postgresql_ops={'phone_normalized': 'text_pattern_ops'},
+            postgresql_where=sa.text('phone_normalized IS NOT NULL'),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_patients_name_trgm', 'patients', ['name'],
+            postgresql_using='gin',
+            postgresql_ops={'name': 'gin_trgm_ops'},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_patients_name_trgm', table_name='patients')
+    op.drop_index('ux_patients_phone_normalized', table_name='patients')
+    op.drop_index('ux_patients_email_normalized', table_name='patients')
+    op.drop_column('patients', 'phone_normalized')
+    op.drop_column('patients', 'email_normalized')
@@ -0,0 +1,46 @@
+"""add token_sequences table
+
+Revision ID: 8134e989790d
+Revises: df2fdf966f71
+Create Date: 2026-10-18 09:12:41.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8134e989790d'
+down_revision: Union[str, Sequence[str], None] = 'df2fdf966f71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'token_sequences',
+        sa.Column('doctor_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('seq_date', sa.Date(), nullable=False),
+        sa.Column('last_number', sa.Integer(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['doctor_id'], ['doctors.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('doctor_id', 'seq_date'),
+    )
+
+    # Seed counters from tokens already issued so numbering continues today.
+    op.execute(
+        """
+        INSERT INTO token_sequences (doctor_id, seq_date, last_number)
+        SELECT doctor_id, created_at::date, MAX(token_number::integer)
+        FROM tokens
+        GROUP BY doctor_id, created_at::date
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('token_sequences')
@@ -0,0 +1,142 @@
+"""partition tokens by token_date
+
+Revision ID: a77aa14fb4ae
+Revises: 223672e040ea
+Create Date: 2026-10-18 13:46:52.118734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a77aa14fb4ae'
+down_revision: Union[str, Sequence[str], None] = '223672e040ea'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TOKEN_INDEXES = """
+CREATE INDEX ix_tokens_doctor_id_token_date_created_at ON tokens (doctor_id, token_date, created_at);
+CREATE INDEX ix_tokens_token_date_status ON tokens (token_date, status);
+CREATE INDEX ix_tokens_active_token_date_created_at ON tokens (token_date, created_at)
+    WHERE status <> 'completed';
+CREATE UNIQUE INDEX ux_tokens_doctor_id_token_date_token_number ON tokens (doctor_id, token_date, token_number);
+"""
+
+DROP_TOKEN_INDEXES = """
+DROP INDEX ix_tokens_doctor_id_token_date_created_at;
+DROP INDEX ix_tokens_token_date_status;
+DROP INDEX ix_tokens_active_token_date_created_at;
+DROP INDEX ux_tokens_doctor_id_token_date_token_number;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Move the existing table aside; index names are schema-wide
+    op.execute(DROP_TOKEN_INDEXES)
+    op.execute("ALTER TABLE tokens RENAME TO tokens_legacy")
+    op.execute("ALTER TABLE tokens_legacy RENAME CONSTRAINT tokens_pkey TO tokens_legacy_pkey")
+
+    # The partition key must be part of the primary key
+    op.execute(
+        """
+        CREATE TABLE tokens (
+            id UUID NOT NULL,
+            token_number VARCHAR NOT NULL,
+            patient_id UUID NOT NULL REFERENCES patients (id),
+            doctor_id UUID NOT NULL REFERENCES doctors (id),
+            status tokenstatus,
+            created_at TIMESTAMP WITHOUT TIME ZONE,
+            token_date DATE NOT NULL DEFAULT ((now() AT TIME ZONE 'utc')::date),
+            PRIMARY KEY (id, token_date)
+        ) PARTITION BY RANGE (token_date)
+        """
+    )
+    op.execute("CREATE TABLE tokens_default PARTITION OF tokens DEFAULT")
+
+    # One partition per month from the oldest token up to three months ahead;
+    # scripts/manage_token_partitions.py keeps this rolling afterwards.
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            month DATE := date_trunc('month', COALESCE(
+                (SELECT MIN(token_date) FROM tokens_legacy),
+                (now() AT TIME ZONE 'utc')::date
+            ))::date;
+            last_month DATE := (date_trunc('month', now() AT TIME ZONE 'utc') + interval '3 months')::date;
+        BEGIN
+            WHILE month <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF tokens FOR VALUES FROM (%L) TO (%L)',
+                    'tokens_p' || to_char(month, 'YYYY_MM'),
+                    month,
+                    (month + interval '1 month')::date
+                );
+                month := (month + interval '1 month')::date;
+            END LOOP;
+        END $$;
+        """
+    )
+
+    op.execute(
+        """
+        INSERT INTO tokens (id, token_number, patient_id, doctor_id, status, created_at, token_date)
+        SELECT id, token_number, patient_id, doctor_id, status, created_at, token_date
+        FROM tokens_legacy
+        """
+    )
+    op.execute("DROP TABLE tokens_legacy")
+    op.execute(TOKEN_INDEXES)
+
+    # Cold storage for detached months, same column layout as the partitions
+    op.execute(
+        """
+        CREATE TABLE tokens_archive (
+            id UUID NOT NULL,
+            token_number VARCHAR NOT NULL,
+            patient_id UUID NOT NULL,
+            doctor_id UUID NOT NULL,
+            status tokenstatus,
+            created_at TIMESTAMP WITHOUT TIME ZONE,
+            token_date DATE NOT NULL,
+            PRIMARY KEY (id, token_date)
+        )
+        """
+    )
+    op.create_index('ix_tokens_archive_doctor_id_token_date', 'tokens_archive', ['doctor_id', 'token_date'])
+    op.create_index('ix_tokens_archive_patient_id', 'tokens_archive', ['patient_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(DROP_TOKEN_INDEXES)
+    op.execute("ALTER TABLE tokens RENAME TO tokens_partitioned")
+    op.execute(
+        """
+        CREATE TABLE tokens (
+            id UUID NOT NULL PRIMARY KEY,
+            token_number VARCHAR NOT NULL,
+            patient_id UUID NOT NULL REFERENCES patients (id),
+            doctor_id UUID NOT NULL REFERENCES doctors (id),
+            status tokenstatus,
+            created_at TIMESTAMP WITHOUT TIME ZONE,
+            token_date DATE NOT NULL DEFAULT ((now() AT TIME ZONE 'utc')::date)
+        )
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO tokens (id, token_number, patient_id, doctor_id, status, created_at, token_date)
+        SELECT id, token_number, patient_id, doctor_id, status, created_at, token_date FROM tokens_archive
+        UNION ALL
+        SELECT id, token_number, patient_id, doctor_id, status, created_at, token_date FROM tokens_partitioned
+        """
+    )
+    op.execute("DROP TABLE tokens_partitioned CASCADE")
+    op.execute("DROP TABLE tokens_archive")
+    op.execute(TOKEN_INDEXES)
@@ -1,11 +1,18 @@
 from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from typing import List, Optional, Tuple
 from uuid import UUID
 
-from app.core.cache import  invalidate_doctors_cache
+from app.core.cache import cached, get_cached_doctors, invalidate_doctors_cache, invalidate_tags
+from app.core.pagination import PageParams, keyset_by_id, select_fields, split_page
+from app.core.token_revocation import revoke_user_tokens
 
 from app.models.user import User
 from app.models.role import Role
+from app.models.user_role import user_roles_table
 from app.models.doctor import Doctor
 from app.models.nurse import Nurse
 from app.models.staff import Staff
@@ -15,7 +22,7 @@ from app.api.v1.schemas.admin import (
     DoctorCreate, DoctorUpdate, DoctorResponse,
     NurseCreate, NurseResponse, NurseUpdate,
     StaffCreate, StaffResponse,
-    SpecialtyCreate, 
+    SpecialtyCreate, SpecialtyResponse,
     EmployeeResponse, StaffUpdate
 )
 
@@ -44,6 +51,8 @@ def add_doctor(payload: DoctorCreate, db: Session):
     db.refresh(doctor)
     
     invalidate_doctors_cache()
+    invalidate_tags("employees")
+    revoke_user_tokens(db, user.id)
 
     return DoctorResponse(
         id=doctor.id,
@@ -72,6 +81,7 @@ def update_doctor(doctor_id: UUID, payload: DoctorUpdate, db: Session):
     user = db.query(User).filter(User.id == doctor.user_id).first()
     
     invalidate_doctors_cache()
+    invalidate_tags("employees")
 
     return DoctorResponse(
         id=doctor.id,
@@ -82,12 +92,13 @@ def update_doctor(doctor_id: UUID, payload: DoctorUpdate, db: Session):
     )
 
 
-def get_all_doctors(db: Session):
+async def _load_doctors(db: AsyncSession) -> list:
     results = (
-        db.query(Doctor, User.email)
-        .join(User, Doctor.user_id == User.id)
-        .all()
-    )
+        await db.execute(
+            select(Doctor, User.email)
+            .join(User, Doctor.user_id == User.id)
+        )
+    ).all()
 
     return [
         DoctorResponse(
@@ -96,11 +107,16 @@ def get_all_doctors(db: Session):
             specialty=doctor.specialty,
             consultation_fee=doctor.consultation_fee,
             email=email,
-        )
+        ).model_dump(mode="json")
         for doctor, email in results
     ]
 
 
+async def get_all_doctors(db: AsyncSession) -> list:
+    # Read-through: the query only runs after a doctor change or on expiry
+    return await get_cached_doctors(lambda: _load_doctors(db))
+
+
 # -------------------------------
 # Add Nurse
 # -------------------------------
@@ -122,6 +138,9 @@ def add_nurse(payload: NurseCreate, db: Session):
     db.commit()
     db.refresh(nurse)
 
+    invalidate_tags("nurses", "employees")
+    revoke_user_tokens(db, user.id)
+
     return NurseResponse(
         id=nurse.id,
         user_id=nurse.user_id,
@@ -139,6 +158,8 @@ def update_nurse(nurse_id: UUID, payload: NurseUpdate, db: Session):
     db.commit()
     db.refresh(nurse)
 
+    invalidate_tags("nurses", "employees")
+
     user = db.query(User).filter(User.id == nurse.user_id).first()
     if not user:
         raise HTTPException(status_code=500, detail="Linked user not found")
@@ -173,6 +194,9 @@ def add_staff(payload: StaffCreate, db: Session):
     db.commit()
     db.refresh(staff)
 
+    invalidate_tags("staff", "employees")
+    revoke_user_tokens(db, user.id)
+
     return StaffResponse(
         id=staff.id,
         user_id=staff.user_id,
@@ -190,6 +214,8 @@ def update_staff(staff_id: UUID, payload: StaffUpdate, db: Session):
     db.commit()
     db.refresh(staff)
 
+    invalidate_tags("staff", "employees")
+
     user = db.query(User).filter(User.id == staff.user_id).first()
 
     return StaffResponse(
@@ -212,23 +238,142 @@ def add_specialty(payload: SpecialtyCreate, db: Session):
     db.add(specialty)
     db.commit()
     db.refresh(specialty)
+
+    invalidate_tags("specialties")
     return specialty
 
+
+@cached(key="specialties", ttl=60 * 60, model=List[SpecialtyResponse], tags=["specialties"])
+def get_all_specialties(db: Session):
+    return [SpecialtyResponse.model_validate(s) for s in db.query(Specialty).all()]
+
+
+# -------------------------------
+# Nurse / Staff listings
+# -------------------------------
+@cached(key="nurses", model=List[NurseResponse], tags=["nurses"])
+def get_all_nurses(db: Session):
+    results = (
+        db.query(Nurse, User.email)
+        .join(User, Nurse.user_id == User.id)
+        .all()
+    )
+
+    return [
+        NurseResponse(
+            id=n.id,
+            user_id=n.user_id,
+            department=n.department,
+            email=email,
+        )
+        for n, email in results
+    ]
+
+
+@cached(key="staff", model=List[StaffResponse], tags=["staff"])
+def get_all_staff(db: Session):
+    results = (
+        db.query(Staff, User.email)
+        .join(User, Staff.user_id == User.id)
+        .all()
+    )
+
+    return [
+        StaffResponse(
+            id=s.id,
+            user_id=s.user_id,
+            department=s.department,
+            email=email,
+        )
+        for s, email in results
+    ]
+
+# -------------------------------
+# Paged user listings
+# -------------------------------
+# Profile field -> (profile model, its columns copied into the profile)
+_PROFILES = {
+    "doctor_profile": (Doctor, ["specialty", "consultation_fee"]),
+    "nurse_profile": (Nurse, ["department"]),
+    "staff_profile": (Staff, ["department"]),
+}
+
+
+def _roles_column():
+    """Role names of the outer query's user, as one sorted array (NULL if none)."""
+    return (
+        select(func.array_agg(aggregate_order_by(Role.name, Role.name)))
+        .select_from(Role)
+        .join(user_roles_table, user_roles_table.c.role_id == Role.id)
+        .where(user_roles_table.c.user_id == User.id)
+        .correlate(User)
+        .scalar_subquery()
+        .label("roles")
+    )
+
+
+def user_page(db: Session, page: PageParams, schema) -> Tuple[List[dict], Optional[str]]:
+    """
+    One page of users as dicts with `schema`'s requested fields, in a single
+    query: the needed user columns, role names aggregated in a correlated
+    subquery and each requested profile through an outer join (user_id is
+    unique on every profile table, so rows never multiply).
+    """
+    fields = select_fields(page.fields, schema)
+    profiles = [name for name in fields if name in _PROFILES]
+
+    columns = [getattr(User, name) for name in fields if name in User.__table__.columns]
+    if "id" not in fields:
+        columns.append(User.id)
+    if profiles and "email" not in fields:
+        # Profile responses carry the user's email
+        columns.append(User.email)
+    if "roles" in fields:
+        columns.append(_roles_column())
+
+    stmt = select(*columns)
+    for name in profiles:
+        model, extra = _PROFILES[name]
+        stmt = stmt.outerjoin(model, model.user_id == User.id)
+        columns = [model.id.label(f"{name}__id")]
+        columns += [getattr(model, column).label(f"{name}__{column}") for column in extra]
+        stmt = stmt.add_columns(*columns)
+
+    rows = db.execute(keyset_by_id(stmt, User.id, page)).all()
+    rows, next_cursor = split_page(rows, page.limit, lambda row: [row.id])
+
+    items = []
+    for row in rows:
+        values = row._mapping
+        item = {}
+        for name in fields:
+            if name == "roles":
+                item[name] = values["roles"] or []
+            elif name in _PROFILES:
+                item[name] = _profile(name, values)
+            else:
+                item[name] = values[name]
+        items.append(item)
+    return items, next_cursor
+
+
+def _profile(name: str, values) -> Optional[dict]:
+    profile_id = values[f"{name}__id"]
+    if profile_id is None:
+        return None
+    profile = {"id": profile_id, "user_id": values["id"], "email": values["email"]}
+    for column in _PROFILES[name][1]:
+        profile[column] = values[f"{name}__{column}"]
+    return profile
+
+
 # -------------------------------
 # View All Employees
 # -------------------------------
-def view_all_employees(db: Session):
-    users = db.query(User).all()
-    employees = []
-
-    for user in users:
-        employees.append(EmployeeResponse(
-            id=user.id,
-            email=user.email,
-            roles=[r.name for r in user.roles],
-            doctor_profile=None,
-            nurse_profile=None,
-            staff_profile=None,
-        ))
-
-    return employees
+@cached(
+    key=lambda db, page: f"employees:{page.limit}:{page.cursor}:{page.fields}",
+    tags=["employees"],
+)
+def view_all_employees(db: Session, page: PageParams) -> dict:
+    rows, next_cursor = user_page(db, page, EmployeeResponse)
+    return {"rows": rows, "next_cursor": next_cursor}
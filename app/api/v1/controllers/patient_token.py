@@ -1,137 +1,345 @@
 from datetime import datetime, time
 import json
+import re
 import uuid
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import text
+from collections import Counter
+from typing import Optional
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy import func, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from app.models.doctor import Doctor
 from app.models.user import User
 from app.api.v1.schemas.admin import DoctorResponse
+from app.api.v1.controllers.admin_controller import get_all_doctors
 
 from datetime import date
-from app.db.session import get_db
-from app.models.patient import Patient
-from app.models.token import Token, TokenStatus
-from app.api.v1.schemas.patient_token import PatientCreate, PatientRead, TokenCreate, TokenRead, TokenUpdateStatus
-
-from app.core.rbac import require_roles # our RBAC decorator
-from app.core.websocket_manager import websocket_manager
-from app.core.redis import redis_client
+from app.db.session import get_async_db
+from app.models.patient import Patient, normalize_email, normalize_phone
+from app.models.token import Token, TokenStatus, utc_today
+from app.api.v1.schemas.patient_token import (
+    PatientBulkCreate, PatientBulkResult, PatientCreate, PatientRead,
+    TokenBulkCreate, TokenCreate, TokenRead, TokenUpdateStatus,
+)
+
+from app.core.rbac import require_permissions # our RBAC decorator
+from app.core.principal_cache import Principal
+from app.core.websocket_manager import token_topics
+from app.core.outbox import add_token_event, notify_outbox
+from app.core.idempotency import IDEMPOTENCY_HEADER, idempotent
+from app.core.pagination import (
+    PageParams, decode_cursor, json_page, keyset_by_id, page_params, select_fields, split_page,
+)
+from app.core.queue_state import queue_state, token_row, token_rows
+from app.core.serialization import raw_json
+from app.core.doctor_queue import read_queue
+from app.core.token_sequencer import next_token_number, reserve_token_numbers
 
 
 router = APIRouter(prefix="/patients", tags=["Patients"])
 
 
 @router.get("/", response_model=list[PatientRead])
-def list_patients(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(["staff", "admin"]))
+async def list_patients(
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_permissions("patients:read"))
+):
+    """One page of patients by id; only the requested columns are selected."""
+    fields = select_fields(page.fields, PatientRead)
+    columns = [getattr(Patient, name) for name in fields]
+    if "id" not in fields:
+        columns.append(Patient.id)
+
+    result = await db.execute(keyset_by_id(select(*columns), Patient.id, page))
+    rows, next_cursor = split_page(result.all(), page.limit, lambda row: [row.id])
+    return json_page(({name: row._mapping[name] for name in fields} for row in rows), next_cursor)
+
+# Digits plus the usual phone punctuation: "+91 98765-43210", "(0471) 2345"
+_PHONE_QUERY = re.compile(r"[\d\s+().-]+")
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+@router.get("/search", response_model=list[PatientRead])
+async def search_patients(
+    q: str = Query(..., min_length=2, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    fields: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_permissions("patients:read"))
 ):
-    return db.query(Patient).all()
+    """
+    As-you-type lookup of returning patients. A phone-like query is a prefix
+    of the normalized phone, one with "@" a prefix of the normalized email,
+    anything else a name substring (trigram index) or email prefix.
+    """
+    fields = select_fields(fields, PatientRead)
+    stmt = select(*[getattr(Patient, name) for name in fields])
+    term = q.strip()
+
+    if _PHONE_QUERY.fullmatch(term) and normalize_phone(term):
+        stmt = stmt.where(Patient.phone_normalized.like(f"{normalize_phone(term)}%"))
+        stmt = stmt.order_by(Patient.phone_normalized)
+    elif "@" in term:
+        stmt = stmt.where(Patient.email_normalized.like(f"{_escape_like(normalize_email(term))}%", escape="\\"))
+        stmt = stmt.order_by(Patient.email_normalized)
+    else:
+        pattern = _escape_like(term)
+        stmt = stmt.where(or_(
+            Patient.name.ilike(f"%{pattern}%", escape="\\"),
+            Patient.email_normalized.like(f"{pattern.lower()}%", escape="\\"),
+        ))
+        stmt = stmt.order_by(func.similarity(Patient.name, term).desc(), Patient.name)
+
+    result = await db.execute(stmt.limit(limit))
+    return json_page(({name: row._mapping[name] for name in fields} for row in result.all()), None)
 
 # -------------------------------
 # 1️⃣ Patient Registration
 # -------------------------------
 @router.post("/", response_model=PatientRead)
   # Only staff/admin can register patients
-def register_patient(patient_in: PatientCreate, db: Session = Depends(get_db), current_user = Depends(require_roles(["staff", "admin"]))):
-    existing = db.query(Patient).filter(
-        (Patient.email == patient_in.email) | (Patient.phone == patient_in.phone)
-    ).first()
-    if existing:
-        raise HTTPException(400, "Patient already exists")
-    patient = Patient(
-        name=patient_in.name,
-        email=patient_in.email,
-        phone=patient_in.phone,
-        age=patient_in.age
-    )
-    db.add(patient)
-    db.commit()
-    db.refresh(patient)
-
-
-    return patient
+async def register_patient(
+    patient_in: PatientCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_permissions("patients:write")),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
+):
+    async with idempotent("patients:create", idempotency_key, current_user.id, patient_in) as idem:
+        if idem.replay is not None:
+            return idem.replay
+
+        # Normalized lookups hit the unique indexes; a missing value matches nothing
+        conditions = []
+        if normalize_email(patient_in.email):
+            conditions.append(Patient.email_normalized == normalize_email(patient_in.email))
+        if normalize_phone(patient_in.phone):
+            conditions.append(Patient.phone_normalized == normalize_phone(patient_in.phone))
+        if conditions:
+            existing = (await db.execute(select(Patient.id).where(or_(*conditions)).limit(1))).scalar()
+            if existing:
+                raise HTTPException(400, "Patient already exists")
+        patient = Patient(
+            name=patient_in.name,
+            email=patient_in.email,
+            phone=patient_in.phone,
+            age=patient_in.age
+        )
+        db.add(patient)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Another desk registered the same email/phone after our check
+            await db.rollback()
+            raise HTTPException(400, "Patient already exists")
+
+        body = PatientRead.model_validate(patient).model_dump(mode="json")
+        await idem.save(body)
+        return body
+
+@router.post("/bulk", response_model=PatientBulkResult)
+async def register_patients_bulk(
+    data: PatientBulkCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_permissions("patients:write")),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
+):
+    """Register a walk-in batch; entries matching a known email/phone are skipped, not rejected."""
+    async with idempotent("patients:create_bulk", idempotency_key, current_user.id, data) as idem:
+        if idem.replay is not None:
+            return idem.replay
+
+        emails = {normalize_email(p.email) for p in data.patients} - {None}
+        phones = {normalize_phone(p.phone) for p in data.patients} - {None}
+
+        # One duplicate check for the whole batch
+        taken_emails, taken_phones = set(), set()
+        if emails or phones:
+            result = await db.execute(
+                select(Patient.email_normalized, Patient.phone_normalized).where(
+                    or_(Patient.email_normalized.in_(emails), Patient.phone_normalized.in_(phones))
+                )
+            )
+            for email, phone in result.all():
+                taken_emails.add(email)
+                taken_phones.add(phone)
+            # Missing email/phone never makes two patients the same
+            taken_emails.discard(None)
+            taken_phones.discard(None)
+
+        patients, duplicates = [], []
+        for index, patient_in in enumerate(data.patients):
+            email, phone = normalize_email(patient_in.email), normalize_phone(patient_in.phone)
+            if email in taken_emails or phone in taken_phones:
+                duplicates.append(index)
+                continue
+            if email:
+                taken_emails.add(email)
+            if phone:
+                taken_phones.add(phone)
+            patients.append(Patient(
+                name=patient_in.name,
+                email=patient_in.email,
+                phone=patient_in.phone,
+                age=patient_in.age
+            ))
+
+        # The flush sends all rows as batched multi-row INSERTs
+        db.add_all(patients)
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(409, "Some of these patients were just registered elsewhere; retry the batch")
+
+        body = PatientBulkResult(
+            created=[PatientRead.model_validate(patient) for patient in patients],
+            duplicates=duplicates,
+        ).model_dump(mode="json")
+        await idem.save(body)
+        return body
 
 # -------------------------------
 # 2️⃣ Generate Token
 # -------------------------------
 @router.post("/token", response_model=TokenRead)
-async def create_token(data: TokenCreate, db: Session = Depends(get_db), current_user = Depends(require_roles(["staff", "admin"]))):
-    # Check doctor exists
-    doctor = db.query(Doctor).filter(Doctor.id == data.doctor_id).first()
-    if not doctor:
-        raise HTTPException(status_code=404, detail="Doctor not found")
-
-    # Check patient exists
-    patient = db.query(Patient).filter(Patient.id == data.patient_id).first()
-    if not patient:
-        raise HTTPException(status_code=404, detail="Patient not found")
-
-    # Generate next token number for this doctor
-    today = datetime.utcnow().date()
-
-    with db.begin():
-        last_token = (
-            db.query(Token)
-            .filter(
-                Token.doctor_id == doctor.id,
-                Token.created_at >= today
-            )
-            .with_for_update()
-            .order_by(Token.created_at.desc())
-            .first()
-        )
+async def create_token(
+    data: TokenCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_permissions("tokens:create")),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
+):
+    async with idempotent("tokens:create", idempotency_key, current_user.id, data) as idem:
+        if idem.replay is not None:
+            return idem.replay
+
+        # Check doctor exists
+        doctor = await db.get(Doctor, data.doctor_id)
+        if not doctor:
+            raise HTTPException(status_code=404, detail="Doctor not found")
+
+        # Check patient exists
+        patient = await db.get(Patient, data.patient_id)
+        if not patient:
+            raise HTTPException(status_code=404, detail="Patient not found")
 
-        next_number = int(last_token.token_number) + 1 if last_token else 1
+        # Generate next token number for this doctor (Redis INCR, see token_sequencer)
+        today = datetime.utcnow().date()
+        next_number = await next_token_number(db, doctor.id, today)
 
         token = Token(
             token_number=str(next_number),
-            patient_id=patient.id,
+            patient=patient,
             doctor_id=doctor.id,
-            status=TokenStatus.waiting
+            status=TokenStatus.waiting,
+            token_date=today
         )
         db.add(token)
-        db.flush()  # token.id guaranteed here
+        await db.flush()
 
+        # Validated once; the same row goes into the event and the response
+        row = token_row(token)
 
- 
-    try:
-        redis_client.rpush(
-          f"doctor:{doctor.id}:tokens",
-            str(token.id)  
-        )
-    except Exception:
-        pass
-
-   
-    await websocket_manager.broadcast({
-        "event": "TOKEN_CREATED",
-        "token_id": str(token.id),
-        "token_number": token.token_number,
-        "doctor_id": str(token.doctor_id),
-        "patient_id": str(token.patient_id),
-        "patient_name": patient.name,
-        "status": token.status.value,
-    })
-
-    
-    
-    return token
+        # Event goes out through the outbox, committed together with the token
+        add_token_event(db, {
+            "event": "TOKEN_CREATED",
+            "token_id": str(token.id),
+            "token_number": token.token_number,
+            "doctor_id": str(token.doctor_id),
+            "patient_id": str(token.patient_id),
+            "patient_name": patient.name,
+            "status": token.status.value,
+            "token": row,
+        }, topics=token_topics(doctor.id, doctor.specialty))
+        await db.commit()
+        notify_outbox()
+
+        await idem.save(row)
+        return raw_json(orjson.dumps(row))
+
+@router.post("/token/bulk", response_model=list[TokenRead])
+async def create_tokens_bulk(
+    data: TokenBulkCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_permissions("tokens:create")),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
+):
+    """Issue tokens for a batch in one transaction; returned in request order."""
+    async with idempotent("tokens:create_bulk", idempotency_key, current_user.id, data) as idem:
+        if idem.replay is not None:
+            return idem.replay
+
+        doctor_ids = {item.doctor_id for item in data.tokens}
+        patient_ids = {item.patient_id for item in data.tokens}
+
+        result = await db.execute(select(Doctor).where(Doctor.id.in_(doctor_ids)))
+        doctors = {doctor.id: doctor for doctor in result.scalars()}
+        if len(doctors) != len(doctor_ids):
+            raise HTTPException(status_code=404, detail="Doctor not found")
+
+        result = await db.execute(select(Patient).where(Patient.id.in_(patient_ids)))
+        patients = {patient.id: patient for patient in result.scalars()}
+        if len(patients) != len(patient_ids):
+            raise HTTPException(status_code=404, detail="Patient not found")
+
+        # One contiguous block of numbers per doctor
+        today = datetime.utcnow().date()
+        numbers = {}
+        # Sorted: the database fallback locks counter rows per doctor until
+        # commit, so concurrent batches must take them in the same order
+        for doctor_id, count in sorted(Counter(item.doctor_id for item in data.tokens).items()):
+            numbers[doctor_id] = iter(await reserve_token_numbers(db, doctor_id, today, count))
+
+        tokens = [
+            Token(
+                token_number=str(next(numbers[item.doctor_id])),
+                patient=patients[item.patient_id],
+                doctor_id=item.doctor_id,
+                status=TokenStatus.waiting,
+                token_date=today
+            )
+            for item in data.tokens
+        ]
+        db.add_all(tokens)
+        await db.flush()
+
+        rows = token_rows(tokens)
+
+        # One aggregated event per doctor, so topic subscribers only see their own
+        for doctor_id, doctor in doctors.items():
+            doctor_rows = [row for row in rows if row["doctor_id"] == str(doctor_id)]
+            add_token_event(db, {
+                "event": "TOKENS_CREATED",
+                "doctor_id": str(doctor_id),
+                "count": len(doctor_rows),
+                "tokens": doctor_rows,
+            }, topics=token_topics(doctor_id, doctor.specialty))
+        await db.commit()
+        notify_outbox()
+
+        await idem.save(rows)
+        return raw_json(orjson.dumps(rows))
 
 # -------------------------------
 # 3️⃣ Doctor Dashboard - View Own Tokens
 # -------------------------------
 @router.get("/tokens", response_model=list[TokenRead])
 
-def doctor_tokens(current_user: User = Depends(require_roles(["doctor"])), db: Session = Depends(get_db)):
-    doctor = db.query(Doctor).filter(Doctor.user_id == current_user.id).first()
+async def doctor_tokens(current_user: Principal = Depends(require_permissions("tokens:read_own")), db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(Doctor).where(Doctor.user_id == current_user.id))
+    doctor = result.scalar_one_or_none()
     if not doctor:
         raise HTTPException(status_code=404, detail="Doctor profile not found")
     
-    tokens = db.query(Token).filter(Token.doctor_id == doctor.id).order_by(Token.created_at.asc()).all()
-    return tokens
+    # Today's queue for this doctor, served from memory (rows already encoded)
+    await queue_state.ensure_current()
+    return raw_json(queue_state.to_json(queue_state.doctor_tokens(doctor.id)))
 
 # -------------------------------
 # 4️⃣ Doctor Updates Token Status
@@ -140,17 +348,23 @@ def doctor_tokens(current_user: User = Depends(require_roles(["doctor"])), db: S
 async def update_token_status(
     token_id: uuid.UUID,
     update: TokenUpdateStatus,
-    current_user: User = Depends(require_roles(["doctor"])),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(require_permissions("tokens:update_status")),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    doctor = db.query(Doctor).filter(Doctor.user_id == current_user.id).first()
+    result = await db.execute(select(Doctor).where(Doctor.user_id == current_user.id))
+    doctor = result.scalar_one_or_none()
     if not doctor:
         raise HTTPException(status_code=404, detail="Doctor profile not found")
 
-    token = db.query(Token).filter(
-        Token.id == token_id,
-        Token.doctor_id == doctor.id
-    ).first()
+    result = await db.execute(
+        select(Token)
+        .options(selectinload(Token.patient))
+        .where(
+            Token.id == token_id,
+            Token.doctor_id == doctor.id
+        )
+    )
+    token = result.scalar_one_or_none()
     if not token:
         raise HTTPException(status_code=404, detail="Token not found")
     allowed_transitions = {
@@ -164,30 +378,21 @@ async def update_token_status(
         )
 
     token.status = update.status
-    db.commit()
-    db.refresh(token)
-
-    redis_key = f"doctor:{token.doctor_id}:current_token"
+    await db.flush()
+    row = token_row(token)
 
-    redis_client.set(
-        redis_key,
-        json.dumps({
-            "token_id": str(token.id),
-            "token_number": token.token_number,
-            "status": token.status,
-            "updated_at": datetime.utcnow().isoformat()
-        })
-    )
-
-    # ✅ SAFE WebSocket broadcast (NO 500 possible)
-    await websocket_manager.broadcast({
+    # Queue mirror and WebSocket broadcast happen in the outbox dispatcher
+    add_token_event(db, {
         "event": "TOKEN_STATUS_UPDATED",
         "token_id": str(token.id),
         "status": token.status.value,
         "doctor_id": str(token.doctor_id),
-    })
+        "token": row,
+    }, topics=token_topics(doctor.id, doctor.specialty))
+    await db.commit()
+    notify_outbox()
 
-    return token
+    return raw_json(orjson.dumps(row))
 
 
 
@@ -196,58 +401,51 @@ async def update_token_status(
 
 
 @router.get("/tokens/today", response_model=list[TokenRead])
-def staff_today_tokens(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(["staff", "admin"]))
+async def staff_today_tokens(
+    page: PageParams = Depends(page_params),
+    current_user: Principal = Depends(require_permissions("tokens:read_today"))
 ):
-    start_of_day = datetime.combine(date.today(), time.min)
+    """Today's tokens in issue order, paged by (created_at, id) over the in-memory queue."""
+    fields = select_fields(page.fields, TokenRead)
+    await queue_state.ensure_current()
+    rows = sorted(queue_state.today_tokens(), key=lambda row: (row["created_at"], row["id"]))
 
-    tokens = (
-        db.query(Token)
-        .filter(Token.created_at >= start_of_day)
-        .order_by(Token.created_at.asc())
-        .all()
-    )
+    if page.cursor is not None:
+        after = tuple(decode_cursor(page.cursor, size=2))
+        rows = [row for row in rows if (row["created_at"], row["id"]) > after]
 
-    return tokens
+    rows, next_cursor = split_page(rows, page.limit, lambda row: [row["created_at"], row["id"]])
+    if page.fields is None:
+        # Whole rows: reuse the queue state's encodings
+        return json_page([queue_state.encoded[row["id"]] for row in rows], next_cursor)
+    return json_page(({name: row[name] for name in fields} for row in rows), next_cursor)
 
 
 
 
 @router.get("/doctors", response_model=list[DoctorResponse])
-def staff_list_doctors(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(["staff", "admin"]))
+async def staff_list_doctors(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_permissions("doctors:read"))
 ):
-    results = (
-        db.query(Doctor, User.email)
-        .join(User, Doctor.user_id == User.id)
-        .all()
-    )
+    return await get_all_doctors(db)
 
-    return [
-        DoctorResponse(
-            id=d.id,
-            user_id=d.user_id,
-            specialty=d.specialty,
-            consultation_fee=d.consultation_fee,
-            email=email,
-        )
-        for d, email in results
-    ]
+@router.get("/doctors/{doctor_id}/queue")
+async def doctor_queue(
+    doctor_id: uuid.UUID,
+    current_user: Principal = Depends(require_permissions("tokens:read_today"))
+):
+    """Today's queue for one doctor plus the token being seen, in one Redis round trip."""
+    queue = await read_queue(doctor_id, utc_today())
+    if queue is None:
+        # Redis unreachable: same data from this worker's queue state
+        await queue_state.ensure_current()
+        tokens = sorted(queue_state.doctor_tokens(doctor_id), key=lambda row: int(row["token_number"]))
+        current = next((row for row in tokens if row["status"] == TokenStatus.in_progress.value), None)
+        queue = {"current": current, "tokens": tokens}
+    return queue
 
 @router.get("/tokens/public/today", response_model=list[TokenRead])
-def public_today_tokens(db: Session = Depends(get_db)):
-    start_of_day = datetime.combine(date.today(), time.min)
-
-    tokens = (
-        db.query(Token)
-        .filter(
-            Token.created_at >= start_of_day,
-            Token.status != TokenStatus.completed
-        )
-        .order_by(Token.created_at.asc())
-        .all()
-    )
-
-    return tokens
+async def public_today_tokens():
+    await queue_state.ensure_current()
+    return raw_json(queue_state.to_json(queue_state.active_tokens()))
@@ -1,14 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
 from uuid import UUID
 
-from app.core.cache import invalidate_doctors_cache
-from app.db.session import get_db
+from app.core.cache import invalidate_doctors_cache, invalidate_tags
+from app.core.pagination import PageParams, json_page, page_params
+from app.db.session import get_db, get_async_db
 from app.api.v1.controllers.admin_controller import (
     add_doctor, get_all_doctors, update_doctor,
     add_nurse, add_staff,
-    add_specialty, update_nurse, update_staff, view_all_employees
+    add_specialty, update_nurse, update_staff, view_all_employees,
+    get_all_nurses, get_all_staff, get_all_specialties
 )
 from app.api.v1.schemas.admin import (
     DoctorCreate, DoctorUpdate, DoctorResponse,
@@ -24,7 +27,8 @@ from app.models.specialty import Specialty
 from app.models.staff import Staff
 from app.models.user import User
 
-from app.core.rbac import require_roles  # our RBAC dependency
+from app.core.rbac import require_permissions  # our RBAC dependency
+from app.core.principal_cache import Principal
 
 router = APIRouter(
     prefix="/admin",
@@ -36,13 +40,13 @@ router = APIRouter(
 # -------------------------------
 
 @router.post("/doctor", response_model=DoctorResponse)
-def create_doctor(payload: DoctorCreate, db: Session = Depends(get_db),current_user: User = Depends(require_roles(["admin"]))):
+def create_doctor(payload: DoctorCreate, db: Session = Depends(get_db),current_user: Principal = Depends(require_permissions("employees:manage"))):
     return add_doctor(payload, db)
 
 
 @router.put("/doctor/{doctor_id}", response_model=DoctorResponse)
 def edit_doctor(doctor_id: UUID, payload: DoctorUpdate, db: Session = Depends(get_db),
-current_user: User = Depends(require_roles(["admin"]))):
+current_user: Principal = Depends(require_permissions("employees:manage"))):
     return update_doctor(doctor_id, payload, db)
 
 
@@ -50,7 +54,7 @@ current_user: User = Depends(require_roles(["admin"]))):
 def delete_doctor(
     doctor_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(["admin"]))
+    current_user: Principal = Depends(require_permissions("employees:manage"))
 ):
     from app.models.doctor import Doctor
     from app.models.token import Token  # IMPORT ONLY THIS
@@ -70,22 +74,23 @@ def delete_doctor(
     db.delete(doctor)
     db.commit()
 
-    
+    invalidate_doctors_cache()
+    invalidate_tags("employees")
 
     return {"message": "Doctor deleted successfully"}
 
 @router.get("/doctors", response_model=List[DoctorResponse])
-def list_doctors(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(["admin"]))
+async def list_doctors(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_permissions("employees:manage"))
 ):
-    return get_all_doctors(db)
+    return await get_all_doctors(db)
 
 @router.get("/doctor/{doctor_id}", response_model=DoctorResponse)
 def get_doctor(
     doctor_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(["admin"]))
+    current_user: Principal = Depends(require_permissions("employees:manage"))
 ):
     doctor = db.query(Doctor).filter(Doctor.id == doctor_id).first()
     if not doctor:
@@ -105,14 +110,14 @@ def get_doctor(
 
 @router.post("/nurse", response_model=NurseResponse)
 def create_nurse(payload: NurseCreate, db: Session = Depends(get_db),
-current_user: User = Depends(require_roles(["admin"]))):
+current_user: Principal = Depends(require_permissions("employees:manage"))):
     return add_nurse(payload, db)
 
 @router.delete("/nurse/{nurse_id}", status_code=200)
 def delete_nurse(
     nurse_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(["admin"]))
+    current_user: Principal = Depends(require_permissions("employees:manage"))
 ):
     from app.models.nurse import Nurse
 
@@ -123,28 +128,16 @@ def delete_nurse(
     db.delete(nurse)
     db.commit()
 
+    invalidate_tags("nurses", "employees")
+
     return {"message": "Nurse deleted successfully"}
 
 @router.get("/nurses", response_model=List[NurseResponse])
 def list_nurses(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(["admin"]))
+    current_user: Principal = Depends(require_permissions("employees:manage"))
 ):
-    results = (
-        db.query(Nurse, User.email)
-        .join(User, Nurse.user_id == User.id)
-        .all()
-    )
-
-    return [
-        NurseResponse(
-            id=n.id,
-            user_id=n.user_id,
-            department=n.department,
-            email=email,
-        )
-        for n, email in results
-    ]
+    return get_all_nurses(db)
 
 
 @router.put("/nurse/{nurse_id}", response_model=NurseResponse)
@@ -152,21 +145,21 @@ def edit_nurse(
     nurse_id: UUID,
     payload: NurseUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(["admin"]))
+    current_user: Principal = Depends(require_permissions("employees:manage"))
 ):
     return update_nurse(nurse_id, payload, db)
 
 
 @router.post("/staff", response_model=StaffResponse)
 def create_staff(payload: StaffCreate, db: Session = Depends(get_db),
-current_user: User = Depends(require_roles(["admin"]))):
+current_user: Principal = Depends(require_permissions("employees:manage"))):
     return add_staff(payload, db)
 
 @router.delete("/staff/{staff_id}", status_code=200)
 def delete_staff(
     staff_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(["admin"]))
+    current_user: Principal = Depends(require_permissions("employees:manage"))
 ):
     from app.models.staff import Staff
 
@@ -177,28 +170,16 @@ def delete_staff(
     db.delete(staff)
     db.commit()
 
+    invalidate_tags("staff", "employees")
+
     return {"message": "Staff deleted successfully"}
 
 @router.get("/staff", response_model=List[StaffResponse])
 def list_staff(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(["admin"]))
+    current_user: Principal = Depends(require_permissions("employees:manage"))
 ):
-    results = (
-        db.query(Staff, User.email)
-        .join(User, Staff.user_id == User.id)
-        .all()
-    )
-
-    return [
-        StaffResponse(
-            id=s.id,
-            user_id=s.user_id,
-            department=s.department,
-            email=email,
-        )
-        for s, email in results
-    ]
+    return get_all_staff(db)
 
 
 @router.put("/staff/{staff_id}", response_model=StaffResponse)
@@ -206,7 +187,7 @@ def edit_staff(
     staff_id: UUID,
     payload: StaffUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(["admin"]))
+    current_user: Principal = Depends(require_permissions("employees:manage"))
 ):
     return update_staff(staff_id, payload, db)
 
@@ -214,14 +195,14 @@ def edit_staff(
 
 @router.post("/specialty", response_model=SpecialtyResponse)
 def create_specialty(payload: SpecialtyCreate, db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(["admin"]))):
+    current_user: Principal = Depends(require_permissions("employees:manage"))):
     return add_specialty(payload, db)
 
 @router.delete("/specialty/{specialty_id}", status_code=200)
 def delete_specialty(
     specialty_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(["admin"]))
+    current_user: Principal = Depends(require_permissions("employees:manage"))
 ):
     from app.models.specialty import Specialty
 
@@ -232,17 +213,20 @@ def delete_specialty(
     db.delete(specialty)
     db.commit()
 
+    invalidate_tags("specialties")
+
     return {"message": "Specialty deleted successfully"}
 
 @router.get("/specialties", response_model=List[SpecialtyResponse])
 def list_specialties(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(["admin"]))
+    current_user: Principal = Depends(require_permissions("employees:manage"))
 ):
-    return db.query(Specialty).all()
+    return get_all_specialties(db)
 
 
 @router.get("/employees", response_model=List[EmployeeResponse])
-def get_all_employees(db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(["admin"]))):
-    return view_all_employees(db)
+def get_all_employees(page: PageParams = Depends(page_params), db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_permissions("employees:manage"))):
+    result = view_all_employees(db, page)
+    return json_page(result["rows"], result["next_cursor"])
@@ -1,20 +1,33 @@
 from typing import List
-from app.api.v1.schemas.auth import LoginRequest, TokenResponse, UserCreate, UserResponse
+from app.api.v1.schemas.auth import (
+    LoginRequest, RefreshRequest, TokenResponse, UserCreate, UserResponse, UserStatusUpdate,
+    RolePermissionsUpdate, RolePermissionsResponse
+)
 
-from app.core.rbac import require_roles
-from app.core.security import create_access_token, create_refresh_token, decode_token
-from app.db.session import get_db
+from app.core.rbac import require_permissions
+from app.core.security import access_claims, create_access_token, create_refresh_token, decode_token
+from app.db.session import get_db, get_async_db
 
 from app.core.auth import get_current_user
-
+from app.core.cache import invalidate_doctors_cache, invalidate_tags
+from app.core.permissions import PERMISSIONS, permissions_changed
+from app.core.principal_cache import Principal
+from app.core.pagination import PageParams, json_page, page_params
+from app.api.v1.controllers.admin_controller import user_page
+from app.core.session_store import RefreshTokenReused, create_session, end_session, rotate_session
+from app.core.token_revocation import revoke_session, revoke_user_tokens
+
+from app.models.permission import Permission
 from app.models.role import Role
-from app.utils.hashing import hash_password
+from app.utils.hashing import hash_password_async, needs_rehash, verify_password_async
 
+import redis
 from fastapi import APIRouter, Depends, HTTPException, Body
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
 
 from app.models.user import User
-from app.utils.hashing import verify_password
 
 
 
@@ -25,7 +38,7 @@ router = APIRouter(prefix='/auth', tags=["Auth"])
 async def create_user(
     data: UserCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(["admin"]))
+    current_user: Principal = Depends(require_permissions("users:manage"))
 ):
     # 1. Check duplicate email
     existing = db.query(User).filter(User.email == data.email).first()
@@ -36,7 +49,7 @@ async def create_user(
     new_user = User(
         email=data.email,
         is_active=data.is_active,
-        hashed_password=hash_password(data.password),
+        hashed_password=await hash_password_async(data.password),
     )
 
     db.add(new_user)
@@ -52,6 +65,8 @@ async def create_user(
     new_user.roles = roles
     db.commit()
 
+    invalidate_tags("employees")
+
     # 4. RELOAD user WITH roles from DB
     new_user = (
         db.query(User)
@@ -64,62 +79,124 @@ async def create_user(
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(payload: LoginRequest, db: Session = Depends(get_db)):
+async def login(payload: LoginRequest, db: AsyncSession = Depends(get_async_db)):
 
     # 1. Check user exists
-    user = db.query(User).filter(User.email == payload.email).first()
+    result = await db.execute(
+        select(User).options(selectinload(User.roles)).where(User.email == payload.email)
+    )
+    user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=400, detail="Invalid email or password")
     
     if not user.is_active:
         raise HTTPException(status_code=403, detail = "User is inactive")
 
-    # 2. Verify password using Argon2
-    if not verify_password(payload.password, user.hashed_password):
+    # 2. Verify password using Argon2 (on the dedicated hashing pool)
+    if not await verify_password_async(payload.password, user.hashed_password):
         raise HTTPException(status_code=400, detail="Invalid email or password")
 
+    # Argon2 settings changed since this hash was made: upgrade it now
+    if needs_rehash(user.hashed_password):
+        user.hashed_password = await hash_password_async(payload.password)
+        await db.commit()
+
     # 3. Create tokens
-    access_token = create_access_token({"user_id": str(user.id)})
-    refresh_token = create_refresh_token({"user_id": str(user.id)})
+    return await _issue_tokens(access_claims(user))
+
+
+
+async def _issue_tokens(claims: dict) -> TokenResponse:
+    """Start a session and return its first token pair."""
+    try:
+        sid, jti = await create_session(claims)
+    except redis.RedisError:
+        # Session store down: a session-less refresh token is still checked
+        # against the database on refresh
+        return TokenResponse(
+            access_token=create_access_token(claims),
+            refresh_token=create_refresh_token({"user_id": claims["user_id"]})
+        )
 
     return TokenResponse(
-        access_token=access_token,
-        refresh_token=refresh_token
+        access_token=create_access_token({**claims, "sid": sid}),
+        refresh_token=create_refresh_token({"user_id": claims["user_id"], "sid": sid, "jti": jti})
     )
 
 
+def _decode_refresh_token(refresh_token: str) -> dict:
+    try:
+        payload = decode_token(refresh_token)
+    except Exception:
+        raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
+    if payload.get("type") != "refresh":
+        raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
+    return payload
+
 
 @router.post("/refresh", response_model=TokenResponse)
-def refresh_token(data: dict = Body(...),db : Session = Depends(get_db)):
+async def refresh_token(data: dict = Body(...), db: AsyncSession = Depends(get_async_db)):
     refresh_token = data.get("refresh_token")
     if not refresh_token:
         raise HTTPException(status_code=400, detail="Refresh token required")
 
-    try:
-        payload = decode_token(refresh_token)
-        user_id = payload.get("user_id")
-        
-    except Exception:
-        raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
-    
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user or not user.is_active:
-        raise HTTPException(
-            status_code=403,
-            detail="User inactive or deleted"
+    payload = _decode_refresh_token(refresh_token)
+    sid = payload.get("sid")
+
+    if sid is None:
+        # Issued before sessions existed (or while Redis was down): check the
+        # user once more and move them onto a session
+        result = await db.execute(
+            select(User).options(selectinload(User.roles)).where(User.id == payload.get("user_id"))
         )
+        user = result.scalar_one_or_none()
+        if not user or not user.is_active:
+            raise HTTPException(
+                status_code=403,
+                detail="User inactive or deleted"
+            )
+        return await _issue_tokens(access_claims(user))
+
+    # Rotation: one Redis round trip, no database
+    try:
+        rotated = await rotate_session(sid, payload.get("jti"))
+    except RefreshTokenReused:
+        revoke_session(sid)
+        raise HTTPException(status_code=401, detail="Refresh token already used; session ended")
+    except redis.RedisError:
+        raise HTTPException(status_code=503, detail="Session store unavailable")
 
+    if rotated is None:
+        raise HTTPException(status_code=401, detail="Session expired or revoked")
 
-    access_token = create_access_token({"user_id": user_id})
-    return {"access_token": access_token, "refresh_token": refresh_token}
+    claims, jti = rotated
+    return TokenResponse(
+        access_token=create_access_token({**claims, "sid": sid}),
+        refresh_token=create_refresh_token({"user_id": claims["user_id"], "sid": sid, "jti": jti})
+    )
 
 
-@router.get("/users", response_model=List[UserResponse])
-def list_users(db: Session = Depends(get_db), current_user: User = Depends(require_roles(["admin"]))):
-    users = db.query(User).all()
+@router.post("/logout", status_code=200)
+def logout(data: RefreshRequest):
+    payload = _decode_refresh_token(data.refresh_token)
+    sid = payload.get("sid")
+
+    if sid is not None:
+        try:
+            end_session(sid)
+        except redis.RedisError:
+            raise HTTPException(status_code=503, detail="Session store unavailable")
+        # Access tokens of this session stop working now, not at expiry
+        revoke_session(sid)
 
-    # convert to safe response objects
-    return [UserResponse.from_orm(u) for u in users]
+    return {"message": "Logged out"}
+
+
+@router.get("/users", response_model=List[UserResponse])
+def list_users(page: PageParams = Depends(page_params), db: Session = Depends(get_db), current_user: Principal = Depends(require_permissions("users:manage"))):
+    # only the requested columns, never the password hash
+    rows, next_cursor = user_page(db, page, UserResponse)
+    return json_page(rows, next_cursor)
 
 
 
@@ -127,14 +204,25 @@ def list_users(db: Session = Depends(get_db), current_user: User = Depends(requi
 def delete_user(
     user_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles(["admin"]))
+    current_user: Principal = Depends(require_permissions("users:manage"))
 ):
-    user = db.query(User).filter(User.id == user_id).first()
+    # Profiles come with the user in one query instead of a lazy load each
+    user = (
+        db.query(User)
+        .options(
+            joinedload(User.doctor_profile),
+            joinedload(User.nurse_profile),
+            joinedload(User.staff_profile),
+        )
+        .filter(User.id == user_id)
+        .first()
+    )
 
     if not user:
         raise HTTPException(404, "User not found")
 
     # Remove role relationships first (avoid orphan rows)
+    was_doctor = user.doctor_profile is not None
     if user.doctor_profile:
         db.delete(user.doctor_profile)
         db.flush()  # Flush without committing
@@ -157,8 +245,65 @@ def delete_user(
     db.delete(user)
     db.commit()
 
+    revoke_user_tokens(db, user_id)
+    invalidate_tags("nurses", "staff", "employees")
+    if was_doctor:
+        invalidate_doctors_cache()
+
     return {"message": "User deleted successfully"}
 
+
+@router.patch("/users/{user_id}/status", response_model=UserResponse)
+def update_user_status(
+    user_id: str,
+    data: UserStatusUpdate,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_permissions("users:manage"))
+):
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(404, "User not found")
+
+    user.is_active = data.is_active
+    db.commit()
+
+    revoke_user_tokens(db, user.id)
+    db.refresh(user)
+
+    return UserResponse.from_orm(user)
+
+@router.put("/roles/{role_name}/permissions", response_model=RolePermissionsResponse)
+def set_role_permissions(
+    role_name: str,
+    data: RolePermissionsUpdate,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_permissions("users:manage"))
+):
+    role = db.query(Role).filter(Role.name == role_name).first()
+    if not role:
+        raise HTTPException(404, "Role not found")
+
+    unknown = set(data.permissions) - set(PERMISSIONS)
+    if unknown:
+        raise HTTPException(400, detail=f"Unknown permissions: {', '.join(sorted(unknown))}")
+
+    role.permissions = db.query(Permission).filter(Permission.name.in_(data.permissions)).all()
+    db.commit()
+
+    # Recompile the bitsets in every worker
+    permissions_changed(db)
+
+    return RolePermissionsResponse(
+        role=role.name,
+        permissions=sorted(p.name for p in role.permissions),
+    )
+
+
 @router.get("/me", response_model=UserResponse)
-def get_me(current_user: User = Depends(get_current_user)):
-    return UserResponse.from_orm(current_user)
+def get_me(current_user: Principal = Depends(get_current_user)):
+    return UserResponse(
+        id=current_user.id,
+        email=current_user.email,
+        is_active=current_user.is_active,
+        roles=sorted(current_user.roles),
+    )
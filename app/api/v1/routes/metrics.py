@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+
+from app.core.cache import cache_stats
+from app.db.session import engine, async_engine
+from app.db.pool_metrics import pool_status
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics")
+def get_metrics():
+    return {
+        "db_pool": {
+            "sync": pool_status(engine),
+            "async": pool_status(async_engine.sync_engine),
+        },
+        "cache": cache_stats(),
+    }
@@ -1,13 +1,95 @@
+import json
+from typing import List
+
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from app.core.websocket_manager import websocket_manager
+
+from app.core.queue_state import queue_state
+from app.core.websocket_manager import websocket_manager, doctor_topic, department_topic
 
 router = APIRouter()
 
+
+def _initial_topics(websocket: WebSocket) -> List[str]:
+    """
+    Topics from the query string, e.g.
+    /ws/tokens?doctor_id=<uuid>&department=cardiology or ?topics=all
+    No topics means "all" so existing display screens keep working.
+    """
+    params = websocket.query_params
+    topics = [t for t in params.get("topics", "").split(",") if t]
+    topics += [doctor_topic(d) for d in params.getlist("doctor_id")]
+    topics += [department_topic(d) for d in params.getlist("department")]
+    return topics
+
+
+def _since(websocket: WebSocket) -> int | None:
+    try:
+        return int(websocket.query_params["since"])
+    except (KeyError, ValueError):
+        return None
+
+
+async def _sync_client(websocket: WebSocket, since: int | None):
+    """
+    Bring a display up to date before live events flow.
+
+    With ?since=<seq> the missed events are replayed from memory; when that
+    is not possible (or with ?snapshot=1) a SNAPSHOT of the active tokens is
+    sent instead. Queued events already covered are skipped afterwards.
+    """
+    subscriber = websocket_manager.subscribers.get(websocket)
+    if subscriber is None:
+        # Already dropped, e.g. its queue overflowed while it waited
+        return
+
+    replay = websocket_manager.replay(since, subscriber.topics) if since is not None else None
+    if replay is not None:
+        messages, up_to_seq = replay
+        for message in messages:
+            await websocket.send_text(message)
+        websocket_manager.start_sending(websocket, after_seq=up_to_seq)
+        return
+
+    await queue_state.ensure_current()
+    if websocket not in websocket_manager.subscribers:
+        return
+    # Only events this worker has already relayed (and applied to the queue
+    # state) are covered. The Redis counter runs ahead of them: it is
+    # reserved before the event is published.
+    seq = websocket_manager.last_seq
+    tokens = queue_state.active_tokens(subscriber.topics)
+    # Rows are spliced in from the queue state's cached encodings
+    snapshot = b'{"event":"SNAPSHOT","seq":%d,"tokens":%b}' % (seq, queue_state.to_json(tokens))
+    await websocket.send_text(snapshot.decode())
+    websocket_manager.start_sending(websocket, after_seq=seq)
+
+
 @router.websocket("/ws/tokens")
 async def websocket_token_updates(websocket: WebSocket):
-    await websocket_manager.connect(websocket)
+    since = _since(websocket)
+    wants_sync = since is not None or websocket.query_params.get("snapshot") in ("1", "true")
+
+    await websocket_manager.connect(websocket, _initial_topics(websocket), start=not wants_sync)
     try:
+        if wants_sync:
+            await _sync_client(websocket, since)
+
         while True:
-            await websocket.receive_text()
+            # Optional control messages:
+            # {"action": "subscribe" | "unsubscribe", "topics": ["doctor:<uuid>", ...]}
+            text = await websocket.receive_text()
+            try:
+                message = json.loads(text)
+                action = message.get("action")
+                topics = [str(t) for t in message.get("topics", [])]
+            except (ValueError, AttributeError, TypeError):
+                continue
+
+            if action == "subscribe":
+                websocket_manager.subscribe(websocket, topics)
+            elif action == "unsubscribe":
+                websocket_manager.unsubscribe(websocket, topics)
     except WebSocketDisconnect:
+        pass
+    finally:
         websocket_manager.disconnect(websocket)
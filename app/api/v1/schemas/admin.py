@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 from typing import Optional, List
 from uuid import UUID
 
@@ -21,8 +21,7 @@ class DoctorResponse(BaseModel):
     consultation_fee: float
     email: str
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # -------------------------------
 # Nurse Schemas
@@ -37,8 +36,7 @@ class NurseResponse(BaseModel):
     department: Optional[str]
     email: str
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # -------------------------------
 # Staff Schemas
@@ -53,8 +51,7 @@ class StaffResponse(BaseModel):
     department: Optional[str]
     email: str
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # -------------------------------
 # Specialty Schemas
@@ -66,8 +63,7 @@ class SpecialtyResponse(BaseModel):
     id: UUID
     name: str
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # -------------------------------
 # Employee View Schema (All Roles)
@@ -80,8 +76,7 @@ class EmployeeResponse(BaseModel):
     nurse_profile: Optional[NurseResponse]
     staff_profile: Optional[StaffResponse]
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class StaffUpdate(BaseModel):
     department: Optional[str]
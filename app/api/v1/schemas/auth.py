@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
 from uuid import UUID
 from typing import List, Optional
 
@@ -35,6 +35,9 @@ class UserCreate(BaseModel):
     is_active: bool
     password: str
 
+class UserStatusUpdate(BaseModel):
+    is_active: bool
+
 class UserResponse(BaseModel):
     id: UUID
     email: EmailStr
@@ -51,8 +54,7 @@ class UserResponse(BaseModel):
         )
 
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # ----------- Role Response -----------
@@ -60,5 +62,14 @@ class RoleResponse(BaseModel):
     id: UUID
     name: str
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+# ----------- Role Permissions -----------
+class RolePermissionsUpdate(BaseModel):
+    permissions: List[str]
+
+
+class RolePermissionsResponse(BaseModel):
+    role: str
+    permissions: List[str]
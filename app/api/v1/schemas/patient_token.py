@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
 from enum import Enum
@@ -21,8 +21,19 @@ class PatientRead(BaseModel):
     phone: Optional[str]
     age: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+# Walk-in batches (camp days, school screenings)
+BULK_MAX_ITEMS = 500
+
+class PatientBulkCreate(BaseModel):
+    patients: List[PatientCreate] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+class PatientBulkResult(BaseModel):
+    created: List[PatientRead]
+    # Positions in the request that matched an existing patient (or an
+    # earlier entry of the same batch) by email or phone and were skipped
+    duplicates: List[int]
 
 class PatientInToken(BaseModel):
     id: UUID
@@ -30,8 +41,7 @@ class PatientInToken(BaseModel):
     email: Optional[EmailStr]
     phone: Optional[str]
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # -------------------------------
 # Token Schemas
@@ -45,6 +55,9 @@ class TokenCreate(BaseModel):
     patient_id: UUID
     doctor_id: UUID
 
+class TokenBulkCreate(BaseModel):
+    tokens: List[TokenCreate] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
 class TokenRead(BaseModel):
     id: UUID
     token_number: str
@@ -54,8 +67,7 @@ class TokenRead(BaseModel):
     created_at: datetime
     patient: Optional[PatientInToken]
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class TokenUpdateStatus(BaseModel):
     status: TokenStatus
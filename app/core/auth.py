@@ -1,18 +1,22 @@
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from uuid import UUID
 
-from app.db.session import get_db
+from app.db.session import get_async_db
 from app.core.security import decode_token
+from app.core.principal_cache import Principal, get_principal, cache_principal
+from app.core.token_revocation import is_token_revoked, revocations_loaded
 from app.models.user import User
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
-    db: Session = Depends(get_db)
-):
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
     if credentials is None:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
@@ -26,11 +30,38 @@ def get_current_user(
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    # Tokens carrying signed roles authorize without touching the DB or cache.
+    # Deactivation and role changes bump the version, so older tokens are revoked;
+    # logout revokes the token's session.
+    if "roles" in payload and "ver" in payload:
+        if not revocations_loaded():
+            # This worker has not read the revocations from Redis yet
+            current = await db.scalar(select(User.token_version).where(User.id == user_id))
+            if current is None or payload["ver"] < current:
+                raise HTTPException(status_code=401, detail="Token revoked")
+        if is_token_revoked(user_id, payload["ver"], payload.get("sid")):
+            raise HTTPException(status_code=401, detail="Token revoked")
+        return Principal(
+            id=user_id,
+            email=payload.get("email"),
+            is_active=True,
+            roles=frozenset(payload["roles"]),
+        )
 
-    if not user.is_active:
+    # Older tokens without claims: cached principal first; the session only connects on a miss
+    principal = await get_principal(user_id)
+    if principal is None:
+        result = await db.execute(
+            select(User).options(selectinload(User.roles)).where(User.id == user_id)
+        )
+        user = result.scalar_one_or_none()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        principal = Principal.from_user(user)
+        await cache_principal(principal)
+
+    if not principal.is_active:
         raise HTTPException(status_code=403, detail="Inactive user")
 
-    return user
+    return principal
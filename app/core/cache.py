@@ -1,52 +1,362 @@
+import asyncio
+import functools
+import inspect
 import json
-from typing import Optional, Any
-from app.core.redis import redis_client
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Union
+
+import orjson
+import redis
+from pydantic import TypeAdapter
+
+from app.core.event_bus import register_handler
+from app.core.redis import redis_client, async_redis_client
+
+logger = logging.getLogger(__name__)
 
 CACHE_EXPIRE_SECONDS = 15 * 60
+# In-process copy; invalidations also reach it over pub/sub, this only
+# bounds staleness when Redis was unreachable
+L1_EXPIRE_SECONDS = 10
+# How long a worker waits for another one that is recomputing the value
+RECOMPUTE_WAIT_SECONDS = 2
+RECOMPUTE_LOCK_SECONDS = 10
+
+CACHE_INVALIDATION_CHANNEL = "events:cache"
+TAG_VERSION_KEY = "cache:tag:{tag}"
+
+# Store only if nobody bumped the version while the value was being computed
+_store_if_current = redis_client.register_script(
+    "if tonumber(redis.call('GET', KEYS[1]) or '0') ~= tonumber(ARGV[1]) then return 0 end "
+    "redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3]) "
+    "return 1"
+)
+_async_store_if_current = async_redis_client.register_script(_store_if_current.script)
+
+_async_release_lock = async_redis_client.register_script(
+    "if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end "
+    "return 0"
+)
+
+_caches: Dict[str, "VersionedCache"] = {}
+
+
+class CacheStats:
+    """Hit/miss counters and time spent per outcome for one cache."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.hit_seconds = 0.0
+        self.miss_seconds = 0.0
+        # Sync cached functions record from threadpool threads
+        self._lock = threading.Lock()
+
+    def hit(self, started: float):
+        with self._lock:
+            self.hits += 1
+            self.hit_seconds += time.perf_counter() - started
+
+    def miss(self, started: float):
+        with self._lock:
+            self.misses += 1
+            self.miss_seconds += time.perf_counter() - started
+
+    def error(self):
+        with self._lock:
+            self.errors += 1
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "avg_hit_ms": round(self.hit_seconds * 1000 / self.hits, 3) if self.hits else None,
+            "avg_miss_ms": round(self.miss_seconds * 1000 / self.misses, 3) if self.misses else None,
+        }
+
+
+_stats: Dict[str, CacheStats] = {}
+
+
+def cache_stats() -> Dict[str, dict]:
+    return {name: stats.as_dict() for name, stats in _stats.items()}
+
+
+class VersionedCache:
+    """
+    Read-through cache for one value: in-process L1, then Redis, then the
+    loader. Writers bump a version stamp instead of racing to delete keys, so
+    a value computed from data read before a write is never served after it.
+    Misses are single-flight: one recompute per worker (asyncio lock) and,
+    through a short Redis lock, roughly one across workers.
+    """
+
+    def __init__(self, name: str, ttl_seconds: int = CACHE_EXPIRE_SECONDS):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.data_key = f"cache:{name}"
+        self.version_key = f"cache:{name}:version"
+        self.lock_key = f"cache:{name}:lock"
+        self._l1: Optional[tuple] = None  # (expires_at, value)
+        # Bumped by every local invalidation; a recompute that started before
+        # one must not fill L1
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        self.stats = _stats.setdefault(name, CacheStats())
+        _caches[name] = self
+
+    def _from_l1(self):
+        entry = self._l1
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    async def get(self, loader: Callable[[], Awaitable[Any]]):
+        started = time.perf_counter()
+        value = self._from_l1()
+        if value is not None:
+            self.stats.hit(started)
+            return value
+        async with self._lock:
+            value = self._from_l1()
+            if value is not None:
+                self.stats.hit(started)
+                return value
+
+            generation = self._generation
+            value, loaded = await self._read_through(loader)
+            if generation == self._generation:
+                self._l1 = (time.monotonic() + L1_EXPIRE_SECONDS, value)
+            if loaded:
+                self.stats.miss(started)
+            else:
+                self.stats.hit(started)
+            return value
+
+    async def _from_redis(self):
+        """(current version, cached value or None)"""
+        version, cached = await async_redis_client.mget(self.version_key, self.data_key)
+        version = int(version or 0)
+        if cached is not None:
+            payload = orjson.loads(cached)
+            if payload["version"] == version:
+                return version, payload["data"]
+        return version, None
+
+    async def _read_through(self, loader):
+        try:
+            version, value = await self._from_redis()
+        except redis.RedisError as e:
+            logger.warning(f"Cache {self.name} bypassed: {e}")
+            self.stats.error()
+            return await loader(), True
+        if value is not None:
+            return value, False
+
+        token = uuid.uuid4().hex
+        try:
+            locked = await async_redis_client.set(self.lock_key, token, nx=True, ex=RECOMPUTE_LOCK_SECONDS)
+            if not locked:
+                # Another worker is recomputing: wait for its result
+                deadline = time.monotonic() + RECOMPUTE_WAIT_SECONDS
+                while time.monotonic() < deadline:
+                    await asyncio.sleep(0.05)
+                    version, value = await self._from_redis()
+                    if value is not None:
+                        return value, False
+        except redis.RedisError:
+            locked = False
+
+        try:
+            value = await loader()
+            payload = orjson.dumps({"version": version, "data": value})
+            await _async_store_if_current(
+                keys=[self.version_key, self.data_key],
+                args=[version, payload, self.ttl_seconds],
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Could not store {self.name} in cache: {e}")
+            self.stats.error()
+        finally:
+            if locked:
+                try:
+                    await _async_release_lock(keys=[self.lock_key], args=[token])
+                except redis.RedisError:
+                    pass
+        return value, True
+
+    def invalidate_local(self):
+        self._generation += 1
+        self._l1 = None
+
+    def invalidate(self):
+        """Bump the version everywhere. Safe to call from sync endpoints."""
+        self.invalidate_local()
+        try:
+            redis_client.incr(self.version_key)
+            redis_client.publish(CACHE_INVALIDATION_CHANNEL, json.dumps({"name": self.name}))
+        except redis.RedisError as e:
+            logger.warning(f"Cache {self.name} invalidation not propagated: {e}")
+
+
+async def _drop_local_copy(message: dict):
+    cache = _caches.get(message.get("name"))
+    if cache is not None:
+        cache.invalidate_local()
+
+
+register_handler(CACHE_INVALIDATION_CHANNEL, _drop_local_copy)
+
+
+# Doctor picker on the front desk and the admin doctors list
+doctors_cache = VersionedCache("doctors_list")
+
+
+async def get_cached_doctors(loader: Callable[[], Awaitable[list]]) -> list:
+    return await doctors_cache.get(loader)
 
-class CustomJSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        # Convert UUID to string
-        if hasattr(obj, 'hex'):
-            return str(obj)
-        # Convert Pydantic models to dict
-        if hasattr(obj, 'model_dump'):
-            return obj.model_dump()
-        elif hasattr(obj, 'dict'):
-            return obj.dict()
-        return super().default(obj)
-
-def cache_doctors_list(doctors_data: list):
-    try:
-        # Use custom encoder to handle UUIDs and Pydantic models
-        doctors_json = json.dumps(doctors_data, cls=CustomJSONEncoder)
-        
-        redis_client.setex(
-            "doctors_list", 
-            CACHE_EXPIRE_SECONDS, 
-            doctors_json
-        )
-        print("✅ Doctors list cached successfully!")
-    except Exception as e:
-        print(f"❌ Failed to cache doctors: {e}")
-        
-def get_cached_doctors() -> Optional[list]:
-  try:
-    cached_data = redis_client.get("doctors_list")
-    if cached_data:
-      print("Returning doctors from cache!")
-      return json.loads(cached_data)
-    print("No cached doctors found")
-    return None
-  except Exception as e:
-    print("Error getting cached doctors:{e}")
-    return None
 
 def invalidate_doctors_cache():
-    
-    try:
-        redis_client.delete("doctors_list")
-        print("✅ Doctors cache invalidated!")
-    except Exception as e:
-        print(f"❌ Error invalidating cache: {e}")
+    doctors_cache.invalidate()
+
+
+class _Codec:
+    """
+    Cache entry format: "<tag versions>|<json>". Typed values go through a
+    pydantic TypeAdapter (serialized and validated in pydantic-core), the
+    rest through orjson.
+    """
+
+    def __init__(self, model: Any = None):
+        self.adapter = TypeAdapter(model) if model is not None else None
+
+    def dump(self, value, stamp: str) -> bytes:
+        if self.adapter is not None:
+            payload = self.adapter.dump_json(value)
+        else:
+            payload = orjson.dumps(value)
+        return stamp.encode() + b"|" + payload
+
+    def load(self, raw: str, stamp: str):
+        """The cached value, or _STALE when it was written under older tag versions."""
+        entry_stamp, _, payload = raw.partition("|")
+        if entry_stamp != stamp:
+            return _STALE
+        if self.adapter is not None:
+            return self.adapter.validate_json(payload)
+        return orjson.loads(payload)
+
+
+_STALE = object()
+
+
+def _stamp(versions: Iterable[Optional[str]]) -> str:
+    return ",".join(version or "0" for version in versions)
+
 
+def cached(
+    key: Union[str, Callable[..., str]],
+    ttl: int = CACHE_EXPIRE_SECONDS,
+    model: Any = None,
+    tags: Iterable[str] = (),
+):
+    """
+    Cache a function's result in Redis.
+
+    key:   the cache key, or a callable building it from the function's arguments
+    ttl:   seconds the entry lives
+    model: type of the result (e.g. List[NurseResponse]); hits come back as
+           validated instances of it. Without one the result must be plain JSON.
+    tags:  invalidate_tags(tag) drops every entry cached under that tag
+
+    Works on sync and async functions. When Redis is unreachable the
+    function is simply called.
+    """
+    tags = tuple(tags)
+    tag_keys = [TAG_VERSION_KEY.format(tag=tag) for tag in tags]
+
+    def decorator(fn):
+        name = key if isinstance(key, str) else fn.__qualname__
+        stats = _stats.setdefault(name, CacheStats())
+        codec = _Codec(model)
+
+        def entry_key(args, kwargs) -> str:
+            return f"cache:{key if isinstance(key, str) else key(*args, **kwargs)}"
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                cache_key = entry_key(args, kwargs)
+                try:
+                    raw, *versions = await async_redis_client.mget(cache_key, *tag_keys)
+                except redis.RedisError:
+                    stats.error()
+                    return await fn(*args, **kwargs)
+
+                stamp = _stamp(versions)
+                if raw is not None:
+                    value = codec.load(raw, stamp)
+                    if value is not _STALE:
+                        stats.hit(started)
+                        return value
+
+                value = await fn(*args, **kwargs)
+                try:
+                    await async_redis_client.set(cache_key, codec.dump(value, stamp), ex=ttl)
+                except redis.RedisError:
+                    stats.error()
+                stats.miss(started)
+                return value
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            cache_key = entry_key(args, kwargs)
+            try:
+                raw, *versions = redis_client.mget(cache_key, *tag_keys)
+            except redis.RedisError:
+                stats.error()
+                return fn(*args, **kwargs)
+
+            stamp = _stamp(versions)
+            if raw is not None:
+                value = codec.load(raw, stamp)
+                if value is not _STALE:
+                    stats.hit(started)
+                    return value
+
+            value = fn(*args, **kwargs)
+            try:
+                redis_client.set(cache_key, codec.dump(value, stamp), ex=ttl)
+            except redis.RedisError:
+                stats.error()
+            stats.miss(started)
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+def invalidate_tags(*tags: str):
+    """
+    Bump the version of each tag. Entries cached under an older version are
+    ignored from now on and expire on their own.
+    """
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for tag in tags:
+            pipe.incr(TAG_VERSION_KEY.format(tag=tag))
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Cache tags {tags} not invalidated: {e}")
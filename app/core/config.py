@@ -8,12 +8,40 @@ class Settings(BaseSettings):
     ADMIN_EMAIL: str
     ADMIN_PASSWORD: str
 
+    # Database pool settings (per engine, per worker process)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 0  # 0 = no limit
+
     # Redis settings
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
     REDIS_PASSWORD: str | None = None
-    REDIS_ENABLED: bool = True
+    REDIS_ENABLED: bool = True  # false = degraded mode, every Redis feature falls back
+    REDIS_MAX_CONNECTIONS: int = 50  # per client, per worker process
+    REDIS_POOL_TIMEOUT: float = 5  # seconds to wait for a free connection
+    REDIS_SOCKET_TIMEOUT: float = 2
+    REDIS_CONNECT_TIMEOUT: float = 2
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+    REDIS_RETRIES: int = 2
+
+    # Authenticated principal cache (user id -> active flag + role names)
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10000
+    PRINCIPAL_CACHE_REDIS: bool = True
+
+    # Argon2 cost. Changing these rehashes each password on its next login.
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536  # KiB
+    ARGON2_PARALLELISM: int = 4
+    # Threads dedicated to hashing (argon2 releases the GIL) and how many
+    # logins may wait for one before new ones get a 503
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,154 @@
+"""
+Per-doctor, per-day token queue in Redis.
+
+    queue:{doctor_id}:{day}:order    ZSET  token_id scored by token number
+    queue:{doctor_id}:{day}:tokens   HASH  token_id -> token row (JSON)
+    queue:{doctor_id}:{day}:current  STR   token_id being seen right now
+
+All three are written together by one Lua script and expire with the day,
+so a reader never sees the order and the state disagree. Postgres stays
+the source of truth; reconcile_queues() repairs Redis from it.
+"""
+import json
+import logging
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+import redis
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+
+from app.core.queue_state import row_day, token_row
+from app.core.redis import redis_client, async_redis_client
+from app.models.token import Token, utc_today
+
+logger = logging.getLogger(__name__)
+
+# Like the sequence keys: outlive the day so midnight stragglers still work
+QUEUE_KEY_TTL_SECONDS = 2 * 24 * 60 * 60
+
+# Apply one token row. Statuses only move forward (a late, older update never
+# overwrites a newer one), and the current pointer follows in_progress/completed.
+_apply_row = redis_client.register_script(
+    "local rank = {waiting = 0, in_progress = 1, completed = 2} "
+    "local existing = redis.call('HGET', KEYS[2], ARGV[1]) "
+    "if existing and rank[cjson.decode(existing)['status']] > rank[ARGV[4]] then return 0 end "
+    "redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1]) "
+    "redis.call('HSET', KEYS[2], ARGV[1], ARGV[3]) "
+    "if ARGV[4] == 'in_progress' then "
+    "  redis.call('SET', KEYS[3], ARGV[1], 'EX', ARGV[5]) "
+    "elseif ARGV[4] == 'completed' and redis.call('GET', KEYS[3]) == ARGV[1] then "
+    "  redis.call('DEL', KEYS[3]) "
+    "end "
+    "redis.call('EXPIRE', KEYS[1], ARGV[5]) "
+    "redis.call('EXPIRE', KEYS[2], ARGV[5]) "
+    "return 1"
+)
+_async_apply_row = async_redis_client.register_script(_apply_row.script)
+
+# Everything a screen needs in one round trip: rows in number order + current id
+_read = async_redis_client.register_script(
+    "local ids = redis.call('ZRANGE', KEYS[1], 0, -1) "
+    "local rows = {} "
+    "if #ids > 0 then rows = redis.call('HMGET', KEYS[2], unpack(ids)) end "
+    "return {redis.call('GET', KEYS[3]) or '', rows}"
+)
+
+
+def queue_keys(doctor_id, day: date) -> List[str]:
+    prefix = f"queue:{doctor_id}:{day.isoformat()}"
+    return [f"{prefix}:order", f"{prefix}:tokens", f"{prefix}:current"]
+
+
+def _args(row: dict) -> list:
+    return [row["id"], int(row["token_number"]), json.dumps(row), row["status"], QUEUE_KEY_TTL_SECONDS]
+
+
+async def record_tokens(rows: List[dict]):
+    """
+    Mirror created/updated tokens (token_rows) into their doctors' queues in
+    one pipelined round trip; the day comes from created_at. Best effort:
+    Postgres has already committed, and reconciliation fixes anything lost
+    while Redis was unreachable.
+    """
+    if not rows:
+        return
+    try:
+        async with async_redis_client.pipeline(transaction=False) as pipe:
+            for row in rows:
+                await _async_apply_row(
+                    keys=queue_keys(row["doctor_id"], row_day(row)), args=_args(row), client=pipe
+                )
+            await pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Doctor queues not updated for {len(rows)} tokens: {e}")
+
+
+async def read_queue(doctor_id, day: date) -> Optional[dict]:
+    """{"current": row or None, "tokens": [rows by number]}; None if Redis is unreachable."""
+    try:
+        current_id, raw_rows = await _read(keys=queue_keys(doctor_id, day))
+    except redis.RedisError:
+        return None
+
+    tokens = [json.loads(raw) for raw in raw_rows if raw]
+    current = next((row for row in tokens if row["id"] == current_id), None)
+    return {"current": current, "tokens": tokens}
+
+
+def reconcile_queues(db: Session, day: date | None = None) -> int:
+    """
+    Rewrite today's Redis queues from Postgres: re-apply every token (the
+    forward-only rule keeps newer live updates), drop ids Postgres doesn't
+    know and fix the current pointers. Returns the number of tokens applied.
+    """
+    day = day or utc_today()
+    tokens = db.execute(
+        select(Token)
+        .options(selectinload(Token.patient))
+        .where(Token.token_date == day)
+    ).scalars().all()
+
+    by_doctor: Dict[str, List[dict]] = {}
+    for token in tokens:
+        by_doctor.setdefault(str(token.doctor_id), []).append(token_row(token))
+
+    try:
+        for doctor_id, rows in by_doctor.items():
+            _reconcile_doctor(doctor_id, day, rows)
+    except redis.RedisError as e:
+        logger.warning(f"Skipping Redis queue reconciliation: {e}")
+        return 0
+
+    logger.info(f"Reconciled {len(tokens)} tokens in {len(by_doctor)} doctor queues for {day}")
+    return len(tokens)
+
+
+def _reconcile_doctor(doctor_id: str, day: date, rows: Iterable[dict]):
+    order_key, tokens_key, current_key = queue_keys(doctor_id, day)
+    rows = list(rows)
+    known = {row["id"] for row in rows}
+
+    pipe = redis_client.pipeline(transaction=True)
+    for row in rows:
+        _apply_row(keys=[order_key, tokens_key, current_key], args=_args(row), client=pipe)
+    pipe.execute()
+
+    # Members Postgres doesn't have (e.g. a rolled back insert)
+    highest = max(int(row["token_number"]) for row in rows)
+    stale = [
+        token_id for token_id in redis_client.zrangebyscore(order_key, 0, highest)
+        if token_id not in known
+    ]
+    if stale:
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.zrem(order_key, *stale)
+        pipe.hdel(tokens_key, *stale)
+        pipe.execute()
+
+    in_progress = [row["id"] for row in rows if row["status"] == "in_progress"]
+    current = redis_client.get(current_key)
+    if in_progress and current not in in_progress:
+        redis_client.set(current_key, in_progress[-1], ex=QUEUE_KEY_TTL_SECONDS)
+    elif not in_progress and current in known:
+        redis_client.delete(current_key)
@@ -0,0 +1,157 @@
+import asyncio
+import inspect
+import logging
+from typing import Awaitable, Callable, Dict, List
+
+import orjson
+import redis
+
+from app.core.config import settings
+from app.core.redis import async_redis_client, async_pubsub_client
+from app.core.serialization import dumps_text
+from app.core.websocket_manager import websocket_manager
+
+logger = logging.getLogger(__name__)
+
+TOKEN_EVENTS_CHANNEL = "events:tokens"
+# Global, monotonically increasing sequence shared by all workers
+TOKEN_EVENTS_SEQ_KEY = "events:tokens:seq"
+
+RECONNECT_DELAY_SECONDS = 1
+MAX_RECONNECT_DELAY_SECONDS = 30
+
+# channel -> coroutines called with the decoded message, in every worker
+_handlers: Dict[str, List[Callable[[dict], Awaitable[None]]]] = {}
+# called (and awaited, if coroutines) after every (re)subscribe, since
+# messages sent meanwhile are lost
+_resubscribe_hooks: List[Callable[[], Awaitable[None] | None]] = []
+_listener_task: asyncio.Task | None = None
+
+
+def register_handler(channel: str, handler: Callable[[dict], Awaitable[None]]):
+    """Register before start_event_bus(); the listener subscribes once."""
+    _handlers.setdefault(channel, []).append(handler)
+
+
+def register_resubscribe_hook(hook: Callable[[], Awaitable[None] | None]):
+    _resubscribe_hooks.append(hook)
+
+
+async def _run_resubscribe_hooks():
+    for hook in _resubscribe_hooks:
+        try:
+            result = hook()
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            logger.exception("Event bus resubscribe hook failed")
+
+
+async def _dispatch(channel: str, message: dict):
+    for handler in _handlers.get(channel, []):
+        try:
+            await handler(message)
+        except Exception:
+            logger.exception(f"Event handler failed for {channel}")
+
+
+async def publish(channel: str, message: dict) -> bool:
+    try:
+        await async_redis_client.publish(channel, dumps_text(message))
+        return True
+    except redis.RedisError as e:
+        logger.warning(f"Event bus publish failed on {channel}: {e}")
+        return False
+
+
+async def _relay_token_event(envelope: dict):
+    await websocket_manager.broadcast(envelope["event"], envelope.get("topics", []))
+
+
+async def _reserve_token_event_seqs(count: int) -> List[int]:
+    """`count` consecutive sequence numbers, reserved with one INCRBY."""
+    try:
+        last = await async_redis_client.incrby(TOKEN_EVENTS_SEQ_KEY, count)
+        if last - count < websocket_manager.last_seq:
+            # Counter was lost (Redis flushed); never let clients see seq go back
+            last = websocket_manager.last_seq + count
+            await async_redis_client.set(TOKEN_EVENTS_SEQ_KEY, last)
+    except redis.RedisError:
+        last = websocket_manager.last_seq + count
+    return list(range(last - count + 1, last + 1))
+
+
+async def publish_token_events(envelopes: List[dict]):
+    """
+    Stamp each {"event", "topics"} envelope with the next sequence number
+    (one INCRBY for the batch) and publish them in one pipelined round trip;
+    every worker's listener relays them to its own sockets. Without Redis we
+    can still reach this worker's clients.
+    """
+    if not envelopes:
+        return
+    for envelope, seq in zip(envelopes, await _reserve_token_event_seqs(len(envelopes))):
+        envelope["event"]["seq"] = seq
+
+    try:
+        async with async_redis_client.pipeline(transaction=False) as pipe:
+            for envelope in envelopes:
+                pipe.publish(TOKEN_EVENTS_CHANNEL, orjson.dumps(envelope))
+            await pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Event bus batch publish failed: {e}")
+        for envelope in envelopes:
+            await _dispatch(TOKEN_EVENTS_CHANNEL, envelope)
+
+
+register_handler(TOKEN_EVENTS_CHANNEL, _relay_token_event)
+
+
+async def _listen():
+    delay = RECONNECT_DELAY_SECONDS
+
+    while True:
+        pubsub = async_pubsub_client.pubsub()
+        try:
+            await pubsub.subscribe(*_handlers)
+            delay = RECONNECT_DELAY_SECONDS
+            await _run_resubscribe_hooks()
+
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                await _dispatch(message["channel"], orjson.loads(message["data"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Event bus listener disconnected: {e}; retrying in {delay}s")
+        finally:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, MAX_RECONNECT_DELAY_SECONDS)
+
+
+def start_event_bus():
+    global _listener_task
+    if not settings.REDIS_ENABLED:
+        # Single-worker mode: publish_token_events dispatches locally
+        logger.info("Redis disabled; event bus not started")
+        return
+    if _listener_task is None:
+        _listener_task = asyncio.create_task(_listen())
+
+
+async def stop_event_bus():
+    global _listener_task
+    if _listener_task is None:
+        return
+    _listener_task.cancel()
+    try:
+        await _listener_task
+    except asyncio.CancelledError:
+        pass
+    _listener_task = None
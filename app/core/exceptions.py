@@ -4,6 +4,8 @@ from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 import logging
 
+from app.utils.hashing import HasherBusy
+
 # Setup logging
 logger = logging.getLogger("hospital_api")
 
@@ -68,4 +70,19 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
             "details": exc.errors(),
             "path": str(request.url)
         }
-    )
\ No newline at end of file
+    )
+
+async def hasher_busy_exception_handler(request: Request, exc: HasherBusy):
+    """Password hashing is saturated (login burst)"""
+    logger.warning("Password hashing pool is full")
+
+    return JSONResponse(
+        status_code=503,
+        content={
+            "error": "HTTP Error",
+            "message": "Too many logins in progress, try again shortly",
+            "status_code": 503,
+            "path": str(request.url)
+        },
+        headers={"Retry-After": "1"}
+    )
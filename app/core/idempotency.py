@@ -0,0 +1,175 @@
+"""
+Idempotency-Key support for the front-desk POST endpoints.
+
+    idem:{scope}:{user_id}:{key}   STR  {"fp": request hash, "state": "pending" | "done", ...}
+
+The first request with a key claims it (pending) and, once it succeeds,
+stores its response for IDEMPOTENCY_TTL_SECONDS. A retry is answered from
+that entry in one Redis round trip, before any Postgres work or token
+number is spent. Failed requests release the claim so they can be retried.
+Without Redis the header is ignored and requests run normally.
+
+The pending claim expires after PENDING_TTL_SECONDS unless it is refreshed,
+which happens every PENDING_REFRESH_SECONDS while the request is running.
+However long a bulk request waits on the pool or Postgres, retries keep
+getting 409 until it finishes. A claim outlives its request only when the
+worker dies.
+
+One window is left: save() runs after the transaction has committed. If
+Redis fails in between, the tokens exist but the response is not stored.
+The claim is then left pending rather than released, so retries get 409
+until it expires; a retry after that runs again and issues new numbers.
+This is logged as an error.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import uuid
+from typing import Optional
+
+import redis
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from app.core.redis import async_redis_client
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+# How long a finished response is replayed
+IDEMPOTENCY_TTL_SECONDS = 24 * 60 * 60
+# A claim not refreshed for this long is treated as abandoned (worker died
+# mid-request); a running request refreshes it well before that
+PENDING_TTL_SECONDS = 30
+PENDING_REFRESH_SECONDS = 10
+MAX_KEY_LENGTH = 255
+
+# The stored entry, or claim the key and return nothing
+_claim = async_redis_client.register_script(
+    "local existing = redis.call('GET', KEYS[1]) "
+    "if existing then return existing end "
+    "redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2]) "
+    "return false"
+)
+
+# Extend our own pending claim only
+_refresh = async_redis_client.register_script(
+    "if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('EXPIRE', KEYS[1], ARGV[2]) end "
+    "return 0"
+)
+
+# Drop our own pending claim only; it may have expired and been re-claimed
+_release = async_redis_client.register_script(
+    "if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end "
+    "return 0"
+)
+
+
+def _fingerprint(payload: BaseModel) -> str:
+    return hashlib.sha256(payload.model_dump_json().encode()).hexdigest()
+
+
+class IdempotentRequest:
+    """
+    Context manager around one endpoint call:
+
+        async with idempotent("tokens:create", key, current_user.id, data) as idem:
+            if idem.replay is not None:
+                return idem.replay
+            ...
+            await idem.save(body)
+
+    Leaving the block without save() (an exception, a 4xx) releases the claim.
+    """
+
+    def __init__(self, scope: str, key: Optional[str], user_id, payload: BaseModel):
+        self.redis_key = f"idem:{scope}:{user_id}:{key}" if key else None
+        self.fingerprint = _fingerprint(payload) if key else None
+        self.replay: Optional[JSONResponse] = None
+        self._pending: Optional[str] = None
+        self._refresher: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "IdempotentRequest":
+        if self.redis_key is None:
+            return self
+
+        pending = json.dumps({"fp": self.fingerprint, "state": "pending", "claim": uuid.uuid4().hex})
+        try:
+            existing = await _claim(keys=[self.redis_key], args=[pending, PENDING_TTL_SECONDS])
+        except redis.RedisError as e:
+            logger.warning(f"Idempotency key ignored: {e}")
+            return self
+
+        if existing is None:
+            self._pending = pending
+            self._refresher = asyncio.create_task(self._keep_claimed())
+            return self
+
+        entry = json.loads(existing)
+        if entry["fp"] != self.fingerprint:
+            raise HTTPException(
+                status_code=422,
+                detail=f"{IDEMPOTENCY_HEADER} was already used for a different request",
+            )
+        if entry["state"] == "pending":
+            raise HTTPException(
+                status_code=409,
+                detail="A request with this Idempotency-Key is still in progress",
+                headers={"Retry-After": "1"},
+            )
+        self.replay = JSONResponse(
+            status_code=entry["status"],
+            content=entry["body"],
+            headers={"Idempotent-Replayed": "true"},
+        )
+        return self
+
+    async def _keep_claimed(self):
+        while True:
+            await asyncio.sleep(PENDING_REFRESH_SECONDS)
+            try:
+                if not await _refresh(keys=[self.redis_key], args=[self._pending, PENDING_TTL_SECONDS]):
+                    logger.warning(f"Idempotency claim {self.redis_key} expired mid-request")
+                    return
+            except redis.RedisError as e:
+                logger.warning(f"Idempotency claim not refreshed: {e}")
+
+    def _stop_refreshing(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            self._refresher = None
+
+    async def save(self, body, status_code: int = 200):
+        """Store the JSON-ready response body for retries."""
+        if self._pending is None:
+            return
+        self._stop_refreshing()
+        entry = json.dumps({"fp": self.fingerprint, "state": "done", "status": status_code, "body": body})
+        try:
+            await async_redis_client.set(self.redis_key, entry, ex=IDEMPOTENCY_TTL_SECONDS)
+        except redis.RedisError as e:
+            # Committed but not stored: keep the claim until it expires (see above)
+            logger.error(f"Idempotent response for {self.redis_key} not stored after commit: {e}")
+        self._pending = None
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._stop_refreshing()
+        if self._pending is None:
+            return False
+        try:
+            await _release(keys=[self.redis_key], args=[self._pending])
+        except redis.RedisError as e:
+            logger.warning(f"Idempotency claim not released: {e}")
+        self._pending = None
+        return False
+
+
+def idempotent(scope: str, key: Optional[str], user_id, payload: BaseModel) -> IdempotentRequest:
+    if key is not None and not 0 < len(key) <= MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{IDEMPOTENCY_HEADER} must be 1-{MAX_KEY_LENGTH} characters",
+        )
+    return IdempotentRequest(scope, key, user_id, payload)
@@ -0,0 +1,114 @@
+"""
+Transactional outbox for token events.
+
+Endpoints add the event to `outbox_events` in the same transaction as the
+token change and return as soon as it commits. A background task per worker
+drains the table in id order: mirrors the tokens into the Redis doctor
+queues, publishes the batch (sequence numbers are assigned here) and deletes
+the rows. A crash between publishing and deleting re-sends the batch, so
+delivery is at-least-once; every consumer applies token rows idempotently.
+"""
+import asyncio
+import logging
+from typing import Iterable
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.doctor_queue import record_tokens
+from app.core.event_bus import TOKEN_EVENTS_CHANNEL, publish_token_events
+from app.core.queue_state import event_rows
+from app.db.session import AsyncSessionLocal
+from app.models.outbox_event import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = 100
+# Events written by other workers (or left by a crash) are picked up within this
+OUTBOX_POLL_SECONDS = 1.0
+# Only one worker drains at a time so events go out in commit order
+OUTBOX_LOCK_KEY = 720301
+
+_wakeup = asyncio.Event()
+_dispatcher_task: asyncio.Task | None = None
+
+
+def add_token_event(db: AsyncSession, event: dict, topics: Iterable[str] = ()):
+    """Queue a token event in the caller's transaction; call notify_outbox() after commit."""
+    db.add(OutboxEvent(
+        channel=TOKEN_EVENTS_CHANNEL,
+        payload={"event": event, "topics": list(topics)},
+    ))
+
+
+def notify_outbox():
+    """Wake this worker's dispatcher instead of waiting for the next poll."""
+    _wakeup.set()
+
+
+async def _drain_once() -> int | None:
+    """Deliver one batch. Returns how many events went out, None if another worker holds the lock."""
+    async with AsyncSessionLocal() as db:
+        locked = (await db.execute(select(func.pg_try_advisory_xact_lock(OUTBOX_LOCK_KEY)))).scalar()
+        if not locked:
+            return None
+
+        rows = (
+            await db.execute(
+                select(OutboxEvent).order_by(OutboxEvent.id).limit(OUTBOX_BATCH_SIZE)
+            )
+        ).scalars().all()
+        if not rows:
+            await db.commit()
+            return 0
+
+        envelopes = [row.payload for row in rows]
+        await record_tokens([
+            row for envelope in envelopes for row in event_rows(envelope["event"])
+        ])
+        await publish_token_events(envelopes)
+
+        await db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_([row.id for row in rows])))
+        await db.commit()
+        return len(rows)
+
+
+async def _run():
+    while True:
+        _wakeup.clear()
+        try:
+            sent = await _drain_once()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Outbox dispatch failed; retrying")
+            sent = 0
+
+        if sent == OUTBOX_BATCH_SIZE:
+            continue
+        if sent is None:
+            # Another worker is draining; it may have started before our commit
+            await asyncio.sleep(0.05)
+            continue
+        try:
+            await asyncio.wait_for(_wakeup.wait(), OUTBOX_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+def start_outbox_dispatcher():
+    global _dispatcher_task
+    if _dispatcher_task is None:
+        _dispatcher_task = asyncio.create_task(_run())
+
+
+async def stop_outbox_dispatcher():
+    global _dispatcher_task
+    if _dispatcher_task is None:
+        return
+    _dispatcher_task.cancel()
+    try:
+        await _dispatcher_task
+    except asyncio.CancelledError:
+        pass
+    _dispatcher_task = None
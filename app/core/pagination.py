@@ -0,0 +1,107 @@
+"""
+Keyset pagination, field projection and streamed JSON for the list endpoints.
+
+    GET /patients/?limit=200&fields=id,name&cursor=<X-Next-Cursor of the last page>
+
+Pages are taken "after the last key seen" rather than by OFFSET, so page N
+costs the same as page 1. The body stays a plain JSON array; the cursor for
+the next page comes back in the X-Next-Cursor header (absent on the last page).
+"""
+import base64
+import binascii
+import uuid
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple, Type, Union
+
+import orjson
+from fastapi import HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Encoded rows are flushed to the socket in chunks of about this size
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+@dataclass(frozen=True)
+class PageParams:
+    cursor: Optional[str]
+    limit: int
+    fields: Optional[str]
+
+
+def page_params(
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+) -> PageParams:
+    return PageParams(cursor=cursor, limit=limit, fields=fields)
+
+
+def encode_cursor(*values: Any) -> str:
+    raw = orjson.dumps([str(value) for value in values])
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, size: int = 1) -> List[str]:
+    try:
+        values = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def select_fields(fields: Optional[str], schema: Type[BaseModel]) -> List[str]:
+    """Requested field names in the schema's order; all of them when none are given."""
+    if not fields:
+        return list(schema.model_fields)
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(schema.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return [name for name in schema.model_fields if name in requested]
+
+
+def keyset_by_id(stmt, id_column, page: PageParams):
+    """Order by the (UUID) primary key and take one row past the page to detect more."""
+    if page.cursor is not None:
+        try:
+            last_id = uuid.UUID(decode_cursor(page.cursor)[0])
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        stmt = stmt.where(id_column > last_id)
+    return stmt.order_by(id_column).limit(page.limit + 1)
+
+
+def split_page(rows: Sequence, limit: int, cursor_of) -> Tuple[Sequence, Optional[str]]:
+    """Trim the look-ahead row; the next cursor is built from the last row kept."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*cursor_of(rows[-1]))
+
+
+def _encode(rows: Iterable[Union[dict, bytes]]) -> Iterator[bytes]:
+    chunk = bytearray(b"[")
+    first = True
+    for row in rows:
+        if not first:
+            chunk += b","
+        # Rows may come already encoded (queue state)
+        chunk += row if isinstance(row, bytes) else orjson.dumps(row)
+        first = False
+        if len(chunk) >= STREAM_CHUNK_BYTES:
+            yield bytes(chunk)
+            chunk.clear()
+    chunk += b"]"
+    yield bytes(chunk)
+
+
+def json_page(rows: Iterable[Union[dict, bytes]], next_cursor: Optional[str]) -> StreamingResponse:
+    """Stream rows as a JSON array, encoded chunk by chunk instead of as one document."""
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    return StreamingResponse(_encode(rows), media_type="application/json", headers=headers)
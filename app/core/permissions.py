@@ -0,0 +1,151 @@
+import json
+import logging
+from typing import Dict, FrozenSet, Iterable
+
+import redis
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.event_bus import register_handler
+from app.core.redis import redis_client
+from app.db.session import AsyncSessionLocal
+from app.models.permission import Permission
+from app.models.role import Role
+from app.models.role_permission import role_permissions_table
+
+logger = logging.getLogger(__name__)
+
+PERMISSIONS_CHANGED_CHANNEL = "events:permissions"
+
+# Every permission an endpoint can require. The position is the bit, so
+# append new names at the end.
+PERMISSIONS = (
+    "users:manage",
+    "employees:manage",
+    "patients:read",
+    "patients:write",
+    "tokens:create",
+    "tokens:read_today",
+    "tokens:read_own",
+    "tokens:update_status",
+    "doctors:read",
+)
+
+PERMISSION_BITS: Dict[str, int] = {name: 1 << bit for bit, name in enumerate(PERMISSIONS)}
+
+# Granted when a permission is first seeded; admins can change them later.
+DEFAULT_ROLE_PERMISSIONS = {
+    "admin": [
+        "users:manage", "employees:manage",
+        "patients:read", "patients:write",
+        "tokens:create", "tokens:read_today", "doctors:read",
+    ],
+    "staff": [
+        "patients:read", "patients:write",
+        "tokens:create", "tokens:read_today", "doctors:read",
+    ],
+    "doctor": ["tokens:read_own", "tokens:update_status"],
+    "nurse": [],
+}
+
+
+def permission_mask(names: Iterable[str]) -> int:
+    mask = 0
+    for name in names:
+        bit = PERMISSION_BITS.get(name)
+        if bit is None:
+            raise ValueError(f"Unknown permission: {name}")
+        mask |= bit
+    return mask
+
+
+class PermissionMatrix:
+    """
+    Role -> permission bitset, compiled from role_permissions. Checking an
+    endpoint is then a dict lookup and a bitwise AND, with no queries.
+    """
+
+    def __init__(self):
+        self.role_masks: Dict[str, int] = {}
+        # Users usually have one or two roles; their combined mask is memoized
+        self._combined: Dict[FrozenSet[str], int] = {}
+
+    def load(self, pairs: Iterable[tuple]):
+        role_masks: Dict[str, int] = {}
+        for role_name, permission_name in pairs:
+            mask = role_masks.get(role_name, 0)
+            if permission_name is not None:
+                # Permissions no endpoint knows about can't be required anyway
+                mask |= PERMISSION_BITS.get(permission_name, 0)
+            role_masks[role_name] = mask
+
+        # Swap whole dicts so concurrent readers never see a half-built matrix
+        self.role_masks = role_masks
+        self._combined = {}
+        logger.info(f"Permission matrix compiled for {len(role_masks)} roles")
+
+    def mask_for(self, roles: FrozenSet[str]) -> int:
+        mask = self._combined.get(roles)
+        if mask is None:
+            mask = 0
+            for role in roles:
+                mask |= self.role_masks.get(role, 0)
+            self._combined[roles] = mask
+        return mask
+
+    def allows(self, roles: FrozenSet[str], required: int) -> bool:
+        return self.mask_for(roles) & required == required
+
+
+# SINGLE INSTANCE per worker
+permission_matrix = PermissionMatrix()
+
+
+def _matrix_query():
+    return (
+        select(Role.name, Permission.name)
+        .select_from(Role)
+        .outerjoin(role_permissions_table, role_permissions_table.c.role_id == Role.id)
+        .outerjoin(Permission, Permission.id == role_permissions_table.c.permission_id)
+    )
+
+
+def compile_permissions(db: Session):
+    permission_matrix.load(db.execute(_matrix_query()).all())
+
+
+async def _recompile(message: dict):
+    async with AsyncSessionLocal() as db:
+        permission_matrix.load((await db.execute(_matrix_query())).all())
+
+
+def permissions_changed(db: Session):
+    """Recompile here and tell every other worker to do the same."""
+    compile_permissions(db)
+    try:
+        redis_client.publish(PERMISSIONS_CHANGED_CHANNEL, json.dumps({}))
+    except redis.RedisError as e:
+        logger.warning(f"Permission change not propagated: {e}")
+
+
+def seed_permissions(db: Session):
+    """
+    Create missing permissions. A permission seen for the first time is
+    granted to its default roles; existing grants are left alone.
+    """
+    existing = set(db.execute(select(Permission.name)).scalars())
+    roles = {role.name: role for role in db.query(Role).all()}
+
+    for name in PERMISSIONS:
+        if name in existing:
+            continue
+        permission = Permission(name=name)
+        db.add(permission)
+        for role_name, granted in DEFAULT_ROLE_PERMISSIONS.items():
+            if name in granted and role_name in roles:
+                roles[role_name].permissions.append(permission)
+
+    db.commit()
+
+
+register_handler(PERMISSIONS_CHANGED_CHANNEL, _recompile)
@@ -0,0 +1,148 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import FrozenSet, Optional
+from uuid import UUID
+
+import redis
+
+from app.core.config import settings
+from app.core.event_bus import register_handler
+from app.core.redis import redis_client, async_redis_client
+
+logger = logging.getLogger(__name__)
+
+PRINCIPAL_KEY = "principal:{user_id}"
+PRINCIPAL_INVALIDATION_CHANNEL = "events:principals"
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as RBAC sees it: no ORM session attached."""
+    id: UUID
+    email: str
+    is_active: bool
+    roles: FrozenSet[str]
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            is_active=user.is_active,
+            roles=frozenset(role.name for role in user.roles),
+        )
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "id": str(self.id),
+            "email": self.email,
+            "is_active": self.is_active,
+            "roles": sorted(self.roles),
+        })
+
+    @classmethod
+    def from_json(cls, data: str) -> "Principal":
+        raw = json.loads(data)
+        return cls(
+            id=UUID(raw["id"]),
+            email=raw["email"],
+            is_active=raw["is_active"],
+            roles=frozenset(raw["roles"]),
+        )
+
+
+class PrincipalLRU:
+    """Small in-process LRU with a per-entry TTL."""
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple[float, Principal]]" = OrderedDict()
+        # Invalidation can come from threadpool (sync) endpoints
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return principal
+
+    def set(self, principal: Principal):
+        user_id = str(principal.id)
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl_seconds, principal)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, user_id: str):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+_local = PrincipalLRU(settings.PRINCIPAL_CACHE_MAX_SIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS)
+
+
+async def get_principal(user_id: UUID) -> Optional[Principal]:
+    """L1 (this worker), then Redis. None means: load from the database."""
+    key = str(user_id)
+    principal = _local.get(key)
+    if principal is not None or not settings.PRINCIPAL_CACHE_REDIS:
+        return principal
+
+    try:
+        cached = await async_redis_client.get(PRINCIPAL_KEY.format(user_id=key))
+    except redis.RedisError:
+        return None
+    if cached is None:
+        return None
+
+    principal = Principal.from_json(cached)
+    _local.set(principal)
+    return principal
+
+
+async def cache_principal(principal: Principal):
+    _local.set(principal)
+    if not settings.PRINCIPAL_CACHE_REDIS:
+        return
+    try:
+        await async_redis_client.set(
+            PRINCIPAL_KEY.format(user_id=principal.id),
+            principal.to_json(),
+            ex=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+        )
+    except redis.RedisError as e:
+        logger.warning(f"Could not cache principal in Redis: {e}")
+
+
+def invalidate_principal(user_id):
+    """
+    Forget a user's cached principal everywhere: this worker, Redis, and
+    (through pub/sub) every other worker. Call after deleting a user,
+    changing their roles or (de)activating them.
+    """
+    key = str(user_id)
+    _local.discard(key)
+    try:
+        redis_client.delete(PRINCIPAL_KEY.format(user_id=key))
+        redis_client.publish(PRINCIPAL_INVALIDATION_CHANNEL, json.dumps({"user_id": key}))
+    except redis.RedisError as e:
+        logger.warning(f"Principal invalidation not propagated: {e}")
+
+
+async def _drop_local_principal(message: dict):
+    _local.discard(message["user_id"])
+
+
+register_handler(PRINCIPAL_INVALIDATION_CHANNEL, _drop_local_principal)
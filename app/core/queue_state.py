@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time as clock
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Set
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from app.api.v1.schemas.patient_token import TokenRead
+from app.core.serialization import TOKEN_LIST_ADAPTER, json_array
+from app.core.event_bus import TOKEN_EVENTS_CHANNEL, register_handler, register_resubscribe_hook
+from app.core.websocket_manager import matches, token_topics
+from app.db.session import AsyncSessionLocal
+from app.models.doctor import Doctor
+from app.models.token import Token, TokenStatus, utc_today
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on drift if a worker missed events (e.g. Redis was down)
+REBUILD_INTERVAL_SECONDS = 300
+
+
+def token_row(token: Token) -> dict:
+    """The JSON shape used by the token endpoints and WebSocket events."""
+    return TokenRead.model_validate(token).model_dump(mode="json")
+
+
+def token_rows(tokens: Iterable[Token]) -> List[dict]:
+    """token_row for many tokens in one pydantic-core pass."""
+    return TOKEN_LIST_ADAPTER.dump_python(TOKEN_LIST_ADAPTER.validate_python(list(tokens)), mode="json")
+
+
+def row_day(row: dict) -> date:
+    return datetime.fromisoformat(row["created_at"]).date()
+
+
+def event_rows(event: dict) -> List[dict]:
+    """Token rows carried by an event: one ("token") or a bulk batch ("tokens")."""
+    if event.get("token") is not None:
+        return [event["token"]]
+    return event.get("tokens", [])
+
+
+class QueueState:
+    """
+    Today's (UTC day, like token numbering) tokens held in memory, per doctor
+    and overall, in created_at order.
+
+    Built from Postgres once, then kept current by the token events every
+    worker receives, so the read endpoints never rescan the tokens table.
+    """
+
+    def __init__(self):
+        self.day: date | None = None
+        self.built_at = 0.0
+        self.tokens: Dict[str, dict] = {}
+        self.active: Dict[str, dict] = {}
+        self.by_doctor: Dict[str, Dict[str, dict]] = {}
+        self.topics: Dict[str, List[str]] = {}
+        # token_id -> the row encoded as JSON, shared by every response and snapshot
+        self.encoded: Dict[str, bytes] = {}
+        self._lock = asyncio.Lock()
+        # Events that arrive while a rebuild query is running are replayed after it
+        self._pending: List[tuple] | None = None
+
+    def invalidate(self):
+        self.built_at = 0.0
+
+    def _is_current(self) -> bool:
+        return (
+            self.day == utc_today()
+            and clock.monotonic() - self.built_at < REBUILD_INTERVAL_SECONDS
+        )
+
+    async def ensure_current(self):
+        if self._is_current():
+            return
+        async with self._lock:
+            if not self._is_current():
+                await self.rebuild()
+
+    async def rebuild(self):
+        day = utc_today()
+        self._pending = []
+
+        try:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(Token, Doctor.specialty)
+                    .join(Doctor, Token.doctor_id == Doctor.id)
+                    .options(selectinload(Token.patient))
+                    .where(Token.token_date == day)
+                    .order_by(Token.created_at.asc())
+                )
+                found = result.all()
+                rows = list(zip(
+                    token_rows(token for token, _ in found),
+                    [token_topics(token.doctor_id, specialty) for token, specialty in found],
+                ))
+
+            self.day = day
+            self.tokens, self.active, self.by_doctor, self.topics = {}, {}, {}, {}
+            self.encoded = {}
+            for row, topics in rows + self._pending:
+                if row_day(row) == day:
+                    self._upsert(row, topics)
+        finally:
+            self._pending = None
+        self.built_at = clock.monotonic()
+        logger.info(f"Queue state rebuilt with {len(rows)} tokens for {day}")
+
+    def apply(self, row: dict, topics: Iterable[str]):
+        """Apply a created/updated token row from an event."""
+        if self._pending is not None:
+            self._pending.append((row, list(topics)))
+            return
+        if self.day != utc_today():
+            # Day rolled over; the next read rebuilds from scratch
+            self.invalidate()
+            return
+        if row_day(row) != self.day:
+            return
+        self._upsert(row, list(topics))
+
+    def _upsert(self, row: dict, topics: List[str]):
+        token_id = row["id"]
+        self.topics[token_id] = topics
+        self.encoded[token_id] = orjson.dumps(row)
+        targets = [self.tokens, self.by_doctor.setdefault(row["doctor_id"], {})]
+
+        if row["status"] == TokenStatus.completed.value:
+            self.active.pop(token_id, None)
+        else:
+            targets.append(self.active)
+
+        for tokens in targets:
+            if token_id in tokens:
+                # Status change: keeps its place in the queue
+                tokens[token_id] = row
+                continue
+            last = next(reversed(tokens.values()), None)
+            tokens[token_id] = row
+            if last is not None and last["created_at"] > row["created_at"]:
+                # Events from different workers can arrive slightly out of order
+                self._resort(tokens)
+
+    @staticmethod
+    def _resort(tokens: Dict[str, dict]):
+        ordered = sorted(tokens.items(), key=lambda item: item[1]["created_at"])
+        tokens.clear()
+        tokens.update(ordered)
+
+    def to_json(self, rows: Iterable[dict]) -> bytes:
+        """JSON array of rows taken from this state, from the cached encodings."""
+        return json_array(self.encoded[row["id"]] for row in rows)
+
+    def today_tokens(self) -> List[dict]:
+        return list(self.tokens.values())
+
+    def active_tokens(self, topics: Set[str] | None = None) -> List[dict]:
+        if topics is None:
+            return list(self.active.values())
+        return [
+            row for token_id, row in self.active.items()
+            if matches(topics, self.topics[token_id])
+        ]
+
+    def doctor_tokens(self, doctor_id) -> List[dict]:
+        return list(self.by_doctor.get(str(doctor_id), {}).values())
+
+
+# SINGLE INSTANCE per worker
+queue_state = QueueState()
+
+
+async def _apply_token_event(envelope: dict):
+    for row in event_rows(envelope["event"]):
+        queue_state.apply(row, envelope.get("topics", []))
+
+
+register_handler(TOKEN_EVENTS_CHANNEL, _apply_token_event)
+register_resubscribe_hook(queue_state.invalidate)
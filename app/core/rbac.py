@@ -1,18 +1,17 @@
-from typing import List
 from fastapi import Depends, HTTPException
 from app.core.auth import get_current_user
-from app.models.user import User
+from app.core.permissions import permission_mask, permission_matrix
+from app.core.principal_cache import Principal
 
 
-def require_roles(required_roles: List[str]):
-    def role_checker(current_user: User = Depends(get_current_user)):
-        user_roles = [role.name for role in current_user.roles]
+def require_permissions(*permissions: str):
+    # Resolved once here, so an unknown name fails at import time
+    required = permission_mask(permissions)
 
-        if not any(role in user_roles for role in required_roles):
+    async def permission_checker(current_user: Principal = Depends(get_current_user)):
+        if not permission_matrix.allows(current_user.roles, required):
             raise HTTPException(status_code=403, detail="Not enough permissions")
 
         return current_user
 
-    return role_checker  
-
-   
\ No newline at end of file
+    return permission_checker
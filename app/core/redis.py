@@ -1,21 +1,119 @@
 import redis
+import redis.asyncio as aioredis
+from redis.asyncio.retry import Retry as AsyncRetry
+from redis.backoff import ExponentialBackoff
+from redis.retry import Retry
 
+from app.core.config import settings
+
+
+class _DisabledScript:
+  def __init__(self, script, is_async):
+    self.script = script
+    self.is_async = is_async
+
+  def __call__(self, *args, **kwargs):
+    if self.is_async:
+      return _DisabledRedis._fail_async()
+    _DisabledRedis._fail()
+
+
+class _DisabledRedis:
+  """
+  Stands in for a client when REDIS_ENABLED is false. Every command raises
+  redis.ConnectionError, so callers take the same fallback path they use
+  when Redis is down (DB sequencer, local event dispatch, uncached reads).
+  """
+
+  def __init__(self, is_async: bool = False):
+    self.is_async = is_async
+
+  @staticmethod
+  def _fail():
+    raise redis.ConnectionError("Redis is disabled (REDIS_ENABLED=false)")
+
+  @staticmethod
+  async def _fail_async():
+    _DisabledRedis._fail()
+
+  def register_script(self, script):
+    return _DisabledScript(script, self.is_async)
+
+  def pipeline(self, *args, **kwargs):
+    self._fail()
+
+  def pubsub(self, *args, **kwargs):
+    self._fail()
+
+  def __getattr__(self, name):
+    if self.is_async:
+      return lambda *args, **kwargs: self._fail_async()
+    return lambda *args, **kwargs: self._fail()
+
+
+def _connection_kwargs(retry_class):
+  return dict(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    db=settings.REDIS_DB,
+    password=settings.REDIS_PASSWORD,
+    decode_responses=True,
+    socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+    # Pooled connections idle longer than this are PINGed before reuse
+    health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+    # Dropped connections are re-established transparently
+    retry=retry_class(ExponentialBackoff(cap=0.5, base=0.05), settings.REDIS_RETRIES),
+    retry_on_error=[redis.ConnectionError, redis.TimeoutError],
+  )
+
+
+if settings.REDIS_ENABLED:
+  # Sync client for threadpool (sync) endpoints and startup tasks
+  redis_client = redis.Redis(
+    connection_pool=redis.BlockingConnectionPool(
+      max_connections=settings.REDIS_MAX_CONNECTIONS,
+      timeout=settings.REDIS_POOL_TIMEOUT,
+      socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+      **_connection_kwargs(Retry),
+    )
+  )
+
+  # Async client for everything running on the event loop
+  async_redis_client = aioredis.Redis(
+    connection_pool=aioredis.BlockingConnectionPool(
+      max_connections=settings.REDIS_MAX_CONNECTIONS,
+      timeout=settings.REDIS_POOL_TIMEOUT,
+      socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+      **_connection_kwargs(AsyncRetry),
+    )
+  )
+
+  # Pub/sub connections sit idle between messages, so they get no read timeout
+  async_pubsub_client = aioredis.Redis(**_connection_kwargs(AsyncRetry))
+else:
+  redis_client = _DisabledRedis()
+  async_redis_client = _DisabledRedis(is_async=True)
+  async_pubsub_client = _DisabledRedis(is_async=True)
 
-# Create Redis connection
-redis_client = redis.Redis(
-    host='localhost',   
-    port=6379,           
-    db=0,            
-    decode_responses=True 
-    
-)
 
 def test_redis_connection():
+  if not settings.REDIS_ENABLED:
+    print("Redis disabled: running without cache, pub/sub and fast token numbering")
+    return False
   try:
     redis_client.ping()
     print("Redis connection successful!")
     return True
-  except redis.ConnectionError:
+  except redis.RedisError:
     print("Redis connection failed!")
     return False
 
+
+async def redis_status() -> str:
+  if not settings.REDIS_ENABLED:
+    return "disabled"
+  try:
+    await async_redis_client.ping()
+    return "ok"
+  except redis.RedisError:
+    return "unavailable"
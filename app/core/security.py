@@ -22,6 +22,19 @@ def create_access_token(data: Dict, expires_minutes: Optional[int] = None):
     return encoded_jwt
 
 
+def access_claims(user) -> Dict:
+    """
+    Claims that let RBAC authorize from the token alone. `ver` is checked
+    against the revocation set so role changes take effect immediately.
+    """
+    return {
+        "user_id": str(user.id),
+        "email": user.email,
+        "roles": sorted(role.name for role in user.roles),
+        "ver": user.token_version,
+    }
+
+
 def create_refresh_token(data: Dict, expires_minutes: Optional[int] = None):
     to_encode = data.copy()
 
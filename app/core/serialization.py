@@ -0,0 +1,32 @@
+"""
+JSON encoding shared by HTTP responses and WebSocket messages.
+
+Responses default to ORJSONResponse (see app.main). Token rows are validated
+once, when they are created or loaded into the queue state, and then travel
+as plain dicts; the queue state also keeps each row's encoded bytes, which
+list endpoints and WebSocket snapshots join without re-encoding.
+"""
+from typing import Iterable, List
+
+import orjson
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from app.api.v1.schemas.patient_token import TokenRead
+
+# Built once: the validator/serializer for a whole list runs in pydantic-core
+TOKEN_LIST_ADAPTER = TypeAdapter(List[TokenRead])
+
+
+def dumps_text(value) -> str:
+    """orjson for places that need str (WebSocket text frames, Redis payloads)."""
+    return orjson.dumps(value).decode()
+
+
+def json_array(fragments: Iterable[bytes]) -> bytes:
+    return b"[" + b",".join(fragments) + b"]"
+
+
+def raw_json(body: bytes, status_code: int = 200) -> Response:
+    """Send already encoded JSON as is (skips response_model re-validation)."""
+    return Response(content=body, status_code=status_code, media_type="application/json")
@@ -0,0 +1,106 @@
+import json
+import uuid
+from typing import List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.redis import redis_client, async_redis_client
+
+# One hash per login session: user_id, the current refresh token id (jti) and
+# the access-token claims handed out on refresh. A set per user indexes them.
+SESSION_KEY = "session:{sid}"
+USER_SESSIONS_KEY = "user_sessions:{user_id}"
+
+# Swap the refresh token id only if the presented one is current. A stale id
+# means the refresh token was used twice (stolen or replayed): end the session.
+_rotate = async_redis_client.register_script(
+    "local jti = redis.call('HGET', KEYS[1], 'jti') "
+    "if not jti then return false end "
+    "if jti ~= ARGV[1] then redis.call('DEL', KEYS[1]) return {'reused'} end "
+    "redis.call('HSET', KEYS[1], 'jti', ARGV[2]) "
+    "redis.call('EXPIRE', KEYS[1], ARGV[3]) "
+    "return {'ok', redis.call('HGET', KEYS[1], 'claims')}"
+)
+
+# Update claims without resurrecting a session that expired meanwhile
+_set_claims = redis_client.register_script(
+    "if redis.call('EXISTS', KEYS[1]) == 0 then return 0 end "
+    "redis.call('HSET', KEYS[1], 'claims', ARGV[1]) "
+    "return 1"
+)
+
+
+class RefreshTokenReused(Exception):
+    pass
+
+
+def _ttl_seconds() -> int:
+    return settings.REFRESH_TOKEN_EXPIRE_MINUTES * 60
+
+
+def _new_id() -> str:
+    return uuid.uuid4().hex
+
+
+async def create_session(claims: dict) -> Tuple[str, str]:
+    """Start a session for a login. Returns (session id, refresh token id)."""
+    sid, jti = _new_id(), _new_id()
+    user_id = claims["user_id"]
+
+    async with async_redis_client.pipeline(transaction=True) as pipe:
+        pipe.hset(SESSION_KEY.format(sid=sid), mapping={
+            "user_id": user_id,
+            "jti": jti,
+            "claims": json.dumps(claims),
+        })
+        pipe.expire(SESSION_KEY.format(sid=sid), _ttl_seconds())
+        pipe.sadd(USER_SESSIONS_KEY.format(user_id=user_id), sid)
+        pipe.expire(USER_SESSIONS_KEY.format(user_id=user_id), _ttl_seconds())
+        await pipe.execute()
+
+    return sid, jti
+
+
+async def rotate_session(sid: str, jti: str) -> Optional[Tuple[dict, str]]:
+    """
+    Exchange a refresh token id for a new one in a single round trip.
+    Returns (access-token claims, new refresh token id), or None when the
+    session is gone. Raises RefreshTokenReused on replay.
+    """
+    new_jti = _new_id()
+    result = await _rotate(keys=[SESSION_KEY.format(sid=sid)], args=[jti or "", new_jti, _ttl_seconds()])
+    if result is None:
+        return None
+    if result[0] == "reused":
+        raise RefreshTokenReused(sid)
+    return json.loads(result[1]), new_jti
+
+
+def end_session(sid: str) -> Optional[str]:
+    """Delete a session (logout). Returns its user id if it existed."""
+    user_id = redis_client.hget(SESSION_KEY.format(sid=sid), "user_id")
+    redis_client.delete(SESSION_KEY.format(sid=sid))
+    if user_id:
+        redis_client.srem(USER_SESSIONS_KEY.format(user_id=user_id), sid)
+    return user_id
+
+
+def end_user_sessions(user_id) -> List[str]:
+    """Delete every session of a user (deactivation, deletion)."""
+    index = USER_SESSIONS_KEY.format(user_id=user_id)
+    sids = list(redis_client.smembers(index))
+    pipe = redis_client.pipeline(transaction=True)
+    for sid in sids:
+        pipe.delete(SESSION_KEY.format(sid=sid))
+    pipe.delete(index)
+    pipe.execute()
+    return sids
+
+
+def update_user_sessions(user_id, claims: dict):
+    """Give a user's live sessions new claims (role change) so refreshes pick them up."""
+    index = USER_SESSIONS_KEY.format(user_id=user_id)
+    data = json.dumps(claims)
+    for sid in redis_client.smembers(index):
+        if not _set_claims(keys=[SESSION_KEY.format(sid=sid)], args=[data]):
+            # Expired on its own; drop it from the index
+            redis_client.srem(index, sid)
@@ -0,0 +1,179 @@
+import json
+import logging
+import time
+from typing import Dict, Tuple
+
+import redis
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session, selectinload
+
+from app.core.config import settings
+from app.core.event_bus import register_handler, register_resubscribe_hook
+from app.core.principal_cache import invalidate_principal
+from app.core.redis import redis_client, async_redis_client
+from app.core.security import access_claims
+from app.core.session_store import end_user_sessions, update_user_sessions
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# user_id -> {"v": minimum accepted token version, "until": epoch seconds}
+MIN_TOKEN_VERSION_KEY = "auth:min_token_version"
+# session id -> {"until": epoch seconds}, for sessions ended by logout
+REVOKED_SESSIONS_KEY = "auth:revoked_sessions"
+TOKEN_VERSION_CHANNEL = "events:token_versions"
+
+# Deleted users: no version is ever accepted again
+DELETED_USER_VERSION = 2 ** 31 - 1
+
+# Only users with a recent bump (and sessions recently ended) are tracked;
+# once every access token issued before that has expired the entry is
+# useless and gets dropped.
+_min_versions: Dict[str, Tuple[int, float]] = {}
+_revoked_sessions: Dict[str, float] = {}
+# False until this worker has loaded the revocations from Redis once; until
+# then the sets are incomplete and auth checks the version in the database.
+_loaded = False
+
+
+def _entry_ttl_seconds() -> int:
+    return settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60 + 60
+
+
+def revocations_loaded() -> bool:
+    return _loaded
+
+
+def _session_revoked(sid: str) -> bool:
+    until = _revoked_sessions.get(sid)
+    if until is None:
+        return False
+    if until < time.time():
+        _revoked_sessions.pop(sid, None)
+        return False
+    return True
+
+
+def is_token_revoked(user_id, version: int, sid: str | None = None) -> bool:
+    if sid is not None and _session_revoked(sid):
+        return True
+    entry = _min_versions.get(str(user_id))
+    if entry is None:
+        return False
+    min_version, until = entry
+    if until < time.time():
+        _min_versions.pop(str(user_id), None)
+        return False
+    return version < min_version
+
+
+def _remember(user_id: str, min_version: int, until: float):
+    current = _min_versions.get(user_id)
+    if current is None or current[0] <= min_version:
+        _min_versions[user_id] = (min_version, until)
+
+
+def _propagate(key: str, field: str, entry: dict, message: dict):
+    try:
+        redis_client.hset(key, field, json.dumps(entry))
+        redis_client.publish(TOKEN_VERSION_CHANNEL, json.dumps(message))
+    except redis.RedisError as e:
+        logger.warning(f"Token revocation for {field} not propagated: {e}")
+
+
+def revoke_session(sid: str):
+    """Stop access tokens of one session (logout) from authorizing, in all workers."""
+    until = time.time() + _entry_ttl_seconds()
+    _revoked_sessions[sid] = until
+    _propagate(REVOKED_SESSIONS_KEY, sid, {"until": until}, {"sid": sid, "until": until})
+
+
+def revoke_user_tokens(db: Session, user_id) -> int:
+    """
+    Bump the user's token version so every access token issued so far stops
+    authorizing, in all workers. Call after committing a role change,
+    deactivation or deletion. Also drops the cached principal, ends the
+    user's sessions if they can no longer log in, and otherwise gives the
+    sessions the new claims so the next refresh is authorized again.
+    """
+    version = db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(token_version=User.token_version + 1)
+        .returning(User.token_version)
+    ).scalar()
+    db.commit()
+
+    if version is None:
+        version = DELETED_USER_VERSION
+
+    key = str(user_id)
+    until = time.time() + _entry_ttl_seconds()
+    _remember(key, version, until)
+    invalidate_principal(key)
+    _propagate(
+        MIN_TOKEN_VERSION_KEY, key,
+        {"v": version, "until": until},
+        {"user_id": key, "v": version, "until": until},
+    )
+
+    user = db.execute(
+        select(User).options(selectinload(User.roles)).where(User.id == user_id)
+    ).scalar_one_or_none()
+    try:
+        if user is None or not user.is_active:
+            end_user_sessions(key)
+        else:
+            update_user_sessions(key, access_claims(user))
+    except redis.RedisError as e:
+        logger.warning(f"Sessions of {key} not updated: {e}")
+
+    return version
+
+
+async def _load_hash(key: str) -> Dict[str, dict]:
+    """Live entries of a revocation hash; expired ones are deleted."""
+    entries = await async_redis_client.hgetall(key)
+    now = time.time()
+    live, expired = {}, []
+    for field, raw in entries.items():
+        entry = json.loads(raw)
+        if entry["until"] < now:
+            expired.append(field)
+        else:
+            live[field] = entry
+    if expired:
+        await async_redis_client.hdel(key, *expired)
+    return live
+
+
+async def load_revocations():
+    """
+    Fill this worker's sets from Redis, pruning expired entries. Runs on
+    startup and again whenever the event bus resubscribes, since
+    revocations published while it was disconnected never arrive.
+    """
+    global _loaded
+    try:
+        versions = await _load_hash(MIN_TOKEN_VERSION_KEY)
+        sessions = await _load_hash(REVOKED_SESSIONS_KEY)
+    except redis.RedisError as e:
+        logger.warning(f"Could not load token revocations: {e}")
+        return
+
+    for user_id, entry in versions.items():
+        _remember(user_id, entry["v"], entry["until"])
+    for sid, entry in sessions.items():
+        _revoked_sessions[sid] = entry["until"]
+    _loaded = True
+
+
+async def _apply_revocation(message: dict):
+    if "sid" in message:
+        _revoked_sessions[message["sid"]] = message["until"]
+    else:
+        _remember(message["user_id"], message["v"], message["until"])
+
+
+register_handler(TOKEN_VERSION_CHANNEL, _apply_revocation)
+register_resubscribe_hook(load_revocations)
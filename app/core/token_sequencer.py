@@ -0,0 +1,233 @@
+import logging
+from datetime import date, datetime
+from typing import Tuple
+from uuid import UUID
+
+import redis
+from sqlalchemy import Integer, cast, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.redis import redis_client, async_redis_client
+from app.db.session import async_engine
+from app.models.doctor import Doctor
+from app.models.token import Token
+from app.models.token_sequence import TokenSequence
+
+logger = logging.getLogger(__name__)
+
+# Keys outlive their day so requests straddling midnight still find them.
+SEQUENCE_KEY_TTL_SECONDS = 2 * 24 * 60 * 60
+
+# Numbers Redis may hand out before the counter row has to be touched again
+SEQUENCE_LEASE_SIZE = 20
+
+# INCRBY KEYS[1] by ARGV[1] only when it already exists, and return it with
+# the lease in KEYS[2]. A missing key (new day, Redis restart, eviction) must
+# be seeded from Postgres first, otherwise a flushed Redis would restart
+# numbering at 1.
+_incrby_if_exists = redis_client.register_script(
+    "if redis.call('EXISTS', KEYS[1]) == 1 then "
+    "return {redis.call('INCRBY', KEYS[1], ARGV[1]), tonumber(redis.call('GET', KEYS[2]) or '0')} end "
+    "return false"
+)
+
+# Raise the counter to ARGV[1] unless it is already at or above it.
+_raise_to = redis_client.register_script(
+    "local current = tonumber(redis.call('GET', KEYS[1]) or '0') "
+    "if current < tonumber(ARGV[1]) then "
+    "redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2]) return tonumber(ARGV[1]) end "
+    "return current"
+)
+
+# The same scripts on the async client, for the request path
+_async_incrby_if_exists = async_redis_client.register_script(_incrby_if_exists.script)
+_async_raise_to = async_redis_client.register_script(_raise_to.script)
+
+# Conflicts with fallback numbers tolerated before a request gives up on Redis
+MAX_REDIS_ATTEMPTS = 3
+
+
+def sequence_key(doctor_id: UUID, day: date) -> str:
+    return f"doctor:{doctor_id}:seq:{day.isoformat()}"
+
+
+def lease_key(doctor_id: UUID, day: date) -> str:
+    """Highest number the counter row is known to cover, committed."""
+    return f"{sequence_key(doctor_id, day)}:lease"
+
+
+def _counter_query(doctor_id: UUID, day: date):
+    return select(TokenSequence.last_number, TokenSequence.fallback_number).where(
+        TokenSequence.doctor_id == doctor_id, TokenSequence.seq_date == day
+    )
+
+
+def _issued_query(doctor_id: UUID, day: date):
+    return select(func.max(cast(Token.token_number, Integer))).where(
+        Token.doctor_id == doctor_id,
+        Token.token_date == day,
+    )
+
+
+def _floors(db: Session, doctor_id: UUID, day: date) -> Tuple[int, int]:
+    """
+    (leased, issued) for this doctor and day: the counter row's last number,
+    and the highest number known to be issued, by the fallback or in tokens.
+    """
+    counter = db.execute(_counter_query(doctor_id, day)).first()
+    issued = db.execute(_issued_query(doctor_id, day)).scalar()
+    leased, fallback_number = counter or (0, 0)
+    return leased, max(fallback_number, issued or 0)
+
+
+def _issued_floor(db: Session, doctor_id: UUID, day: date) -> int:
+    """Highest token number Postgres knows about for this doctor and day."""
+    return max(_floors(db, doctor_id, day))
+
+
+async def _issued_floor_async(db: AsyncSession, doctor_id: UUID, day: date) -> int:
+    counter = (await db.execute(_counter_query(doctor_id, day))).first()
+    issued = (await db.execute(_issued_query(doctor_id, day))).scalar()
+    return max(*(counter or (0, 0)), issued or 0)
+
+
+def _lease_end(number: int) -> int:
+    return -(-number // SEQUENCE_LEASE_SIZE) * SEQUENCE_LEASE_SIZE
+
+
+async def _extend_lease(doctor_id: UUID, day: date, lease: int) -> int:
+    """
+    Raise the counter row to `lease` and return the highest number the
+    fallback has issued. Runs in a short transaction of its own, so the row
+    lock is not held through the caller's request and the lease is committed
+    before any number under it is handed out.
+    """
+    stmt = insert(TokenSequence).values(doctor_id=doctor_id, seq_date=day, last_number=lease)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TokenSequence.doctor_id, TokenSequence.seq_date],
+        set_={"last_number": func.greatest(TokenSequence.last_number, lease)},
+    ).returning(TokenSequence.fallback_number)
+
+    async with async_engine.begin() as conn:
+        return (await conn.execute(stmt)).scalar_one()
+
+
+async def _reserve_from_redis(db: AsyncSession, doctor_id: UUID, day: date, count: int) -> int | None:
+    """
+    Last number of `count` consecutive ones, reserved with one INCRBY.
+    None when Redis keeps colliding with numbers the fallback issued.
+    """
+    key, lease_at = sequence_key(doctor_id, day), lease_key(doctor_id, day)
+
+    for _ in range(MAX_REDIS_ATTEMPTS):
+        reserved = await _async_incrby_if_exists(keys=[key, lease_at], args=[count])
+        if reserved is None:
+            # SET NX: when several workers seed at once only the first one wins.
+            floor = await _issued_floor_async(db, doctor_id, day)
+            await async_redis_client.set(key, floor, nx=True, ex=SEQUENCE_KEY_TTL_SECONDS)
+            reserved = await _async_incrby_if_exists(keys=[key, lease_at], args=[count])
+            if reserved is None:
+                continue
+
+        last, lease = int(reserved[0]), int(reserved[1])
+        if last <= lease:
+            return last
+
+        # The block runs past the lease: commit the next one before using it.
+        fallback_number = await _extend_lease(doctor_id, day, _lease_end(last))
+        if fallback_number <= last - count:
+            await _async_raise_to(keys=[lease_at], args=[_lease_end(last), SEQUENCE_KEY_TTL_SECONDS])
+            return last
+
+        # A worker that could not reach Redis already issued part of this
+        # block: move the shared counter past everything the fallback handed out.
+        logger.warning(f"Tokens up to {last} for doctor {doctor_id} overlap the fallback's; skipping ahead")
+        await _async_raise_to(keys=[key], args=[fallback_number, SEQUENCE_KEY_TTL_SECONDS])
+
+    return None
+
+
+async def _reserve_from_db(db: AsyncSession, doctor_id: UUID, day: date, count: int) -> int:
+    """Atomic upsert on the counter row; joins the caller's transaction."""
+    floor = await _issued_floor_async(db, doctor_id, day)
+
+    # last_number covers every lease Redis has committed, so the fallback
+    # starts above anything Redis may hand out without asking again.
+    stmt = insert(TokenSequence).values(
+        doctor_id=doctor_id, seq_date=day, last_number=floor + count, fallback_number=floor + count
+    )
+    last = func.greatest(TokenSequence.last_number, TokenSequence.fallback_number, floor) + count
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TokenSequence.doctor_id, TokenSequence.seq_date],
+        set_={"last_number": last, "fallback_number": last},
+    ).returning(TokenSequence.last_number)
+
+    return (await db.execute(stmt)).scalar_one()
+
+
+async def reserve_token_numbers(db: AsyncSession, doctor_id: UUID, day: date, count: int) -> range:
+    """
+    Allocate `count` consecutive token numbers for a doctor on a given day.
+
+    Redis INCRBY is the fast path. Redis only hands out numbers under a lease
+    committed to the counter row, one row write per SEQUENCE_LEASE_SIZE
+    numbers, so the database fallback, used when Redis is unreachable from
+    this worker, never hands out a number Redis has reserved.
+    """
+    last = None
+    try:
+        last = await _reserve_from_redis(db, doctor_id, day, count)
+    except redis.RedisError as e:
+        logger.warning(f"Token sequencer falling back to database: {e}")
+    if last is None:
+        last = await _reserve_from_db(db, doctor_id, day, count)
+    return range(last - count + 1, last + 1)
+
+
+async def next_token_number(db: AsyncSession, doctor_id: UUID, day: date) -> int:
+    """Allocate the next token number for a doctor on a given day."""
+    return (await reserve_token_numbers(db, doctor_id, day, 1))[0]
+
+
+def reconcile_sequences(db: Session, day: date | None = None):
+    """
+    Bring Redis counters and the counter table to the same value for every
+    doctor: the highest of Redis and the issued tokens, or of the stored
+    counter and the issued tokens where Redis lost its counter. Run on
+    startup so neither side can hand out a number twice.
+    """
+    day = day or datetime.utcnow().date()
+
+    doctor_ids = list(db.execute(select(Doctor.id)).scalars())
+    if not doctor_ids:
+        return
+
+    floors = {doctor_id: _floors(db, doctor_id, day) for doctor_id in doctor_ids}
+    targets = {doctor_id: max(floor) for doctor_id, floor in floors.items()}
+
+    try:
+        cached = redis_client.mget([sequence_key(d, day) for d in doctor_ids])
+        for doctor_id, value in zip(doctor_ids, cached):
+            if value is not None:
+                # The unused rest of a live counter's lease is not skipped
+                targets[doctor_id] = max(floors[doctor_id][1], int(value))
+
+        for doctor_id, target in targets.items():
+            if target:
+                _raise_to(keys=[sequence_key(doctor_id, day)], args=[target, SEQUENCE_KEY_TTL_SECONDS])
+    except redis.RedisError as e:
+        logger.warning(f"Skipping Redis sequence reconciliation: {e}")
+
+    for doctor_id, target in targets.items():
+        if not target:
+            continue
+        stmt = insert(TokenSequence).values(doctor_id=doctor_id, seq_date=day, last_number=target)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TokenSequence.doctor_id, TokenSequence.seq_date],
+            set_={"last_number": func.greatest(TokenSequence.last_number, target)},
+        )
+        db.execute(stmt)
+
+    db.commit()
@@ -1,33 +1,195 @@
 from fastapi import WebSocket
-from typing import Set
-import json
+from collections import deque
+from typing import Dict, Iterable, List, Set
+import asyncio
+import logging
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+ALL_TOPIC = "all"
+
+# Messages buffered per connection before it counts as a slow consumer
+SEND_QUEUE_SIZE = 100
+# A single send that takes longer than this drops the connection
+SEND_TIMEOUT_SECONDS = 5
+# WebSocket close code 1013 = "try again later"
+SLOW_CONSUMER_CLOSE_CODE = 1013
+# Recent sequenced events kept for clients resuming after a reconnect
+HISTORY_SIZE = 1000
+
+
+def doctor_topic(doctor_id) -> str:
+    return f"doctor:{doctor_id}"
+
+
+def department_topic(department: str) -> str:
+    return f"department:{department.strip().lower()}"
+
+
+def token_topics(doctor_id, department: str | None) -> List[str]:
+    topics = [doctor_topic(doctor_id)]
+    if department:
+        topics.append(department_topic(department))
+    return topics
+
+
+def matches(subscribed: Set[str], topics: Iterable[str]) -> bool:
+    return ALL_TOPIC in subscribed or not subscribed.isdisjoint(topics)
+
+
+class Subscriber:
+    """One connected client: its topics, its send queue and its sender task."""
+
+    def __init__(self, websocket: WebSocket, topics: Iterable[str]):
+        self.websocket = websocket
+        self.topics: Set[str] = set(topics) or {ALL_TOPIC}
+        # (seq, message) pairs; seq is None for unsequenced events
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        self.sender: asyncio.Task | None = None
+        # Events at or below this seq were already covered by a snapshot/replay
+        self.after_seq = 0
+
 
 class WebSocketManager:
+    """
+    Topic-indexed broadcaster.
+
+    broadcast() only enqueues; each connection drains its own bounded queue
+    in a dedicated task, so a slow screen never delays other clients or the
+    request that produced the event. Clients that fall behind are closed.
+    """
+
     def __init__(self):
-        self.active_connections: Set[WebSocket] = set()
+        self.subscribers: Dict[WebSocket, Subscriber] = {}
+        self.topics: Dict[str, Set[Subscriber]] = {}
+        # Close handshakes of dropped clients; the loop only keeps weak references
+        self._closing: Set[asyncio.Task] = set()
+        # (seq, topics, message) for the most recent sequenced events
+        self.history: deque = deque(maxlen=HISTORY_SIZE)
+        self.last_seq = 0
 
-    async def connect(self, websocket: WebSocket):
+    async def connect(self, websocket: WebSocket, topics: Iterable[str] = (), start: bool = True):
+        """
+        Register a client. With start=False events are queued but not sent
+        until start_sending(), which lets the caller send a snapshot first.
+        """
         await websocket.accept()
-        self.active_connections.add(websocket)
+        subscriber = Subscriber(websocket, topics)
+        self.subscribers[websocket] = subscriber
+        for topic in subscriber.topics:
+            self.topics.setdefault(topic, set()).add(subscriber)
+        if start:
+            self.start_sending(websocket)
+        return subscriber
 
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.discard(websocket)
+    def start_sending(self, websocket: WebSocket, after_seq: int = 0):
+        subscriber = self.subscribers.get(websocket)
+        if subscriber is None or subscriber.sender is not None:
+            return
+        subscriber.after_seq = after_seq
+        subscriber.sender = asyncio.create_task(self._send_loop(subscriber))
+
+    def replay(self, since: int, topics: Set[str]):
+        """
+        Messages after `since` for these topics, plus the seq they run up to.
+        None when the history does not reach back that far, or when the client
+        is ahead of this worker (e.g. the worker just restarted).
+        """
+        if since > self.last_seq or not self.history or self.history[0][0] > since + 1:
+            return None
+
+        messages = [
+            message for seq, event_topics, message in self.history
+            if seq > since and matches(topics, event_topics)
+        ]
+        return messages, self.last_seq
+
+    def subscribe(self, websocket: WebSocket, topics: Iterable[str]):
+        subscriber = self.subscribers.get(websocket)
+        if subscriber is None:
+            return
+        for topic in topics:
+            subscriber.topics.add(topic)
+            self.topics.setdefault(topic, set()).add(subscriber)
+
+    def unsubscribe(self, websocket: WebSocket, topics: Iterable[str]):
+        subscriber = self.subscribers.get(websocket)
+        if subscriber is None:
+            return
+        for topic in topics:
+            subscriber.topics.discard(topic)
+            self._remove_from_topic(topic, subscriber)
 
-    async def broadcast(self, event: dict):
-        if not self.active_connections:
+    def disconnect(self, websocket: WebSocket):
+        subscriber = self.subscribers.pop(websocket, None)
+        if subscriber is None:
             return
+        for topic in subscriber.topics:
+            self._remove_from_topic(topic, subscriber)
+        if subscriber.sender and subscriber.sender is not asyncio.current_task():
+            subscriber.sender.cancel()
+
+    async def broadcast(self, event: dict, topics: Iterable[str] = ()):
+        topics = set(topics)
+        seq = event.get("seq")
+        # Encoded once per event, shared by every recipient and the replay history
+        message = orjson.dumps(event).decode()
+
+        if seq is not None:
+            self.history.append((seq, topics, message))
+            self.last_seq = max(self.last_seq, seq)
 
-        message = json.dumps(event)
-        dead = []
+        recipients: Set[Subscriber] = set()
+        for topic in {ALL_TOPIC, *topics}:
+            recipients |= self.topics.get(topic, set())
 
-        for ws in self.active_connections:
+        for subscriber in recipients:
             try:
-                await ws.send_text(message)
-            except Exception:
-                dead.append(ws)
+                subscriber.queue.put_nowait((seq, message))
+            except asyncio.QueueFull:
+                logger.warning("Dropping slow WebSocket consumer")
+                self._drop(subscriber)
+
+    def _remove_from_topic(self, topic: str, subscriber: Subscriber):
+        members = self.topics.get(topic)
+        if members is None:
+            return
+        members.discard(subscriber)
+        if not members:
+            del self.topics[topic]
+
+    def _drop(self, subscriber: Subscriber):
+        self.disconnect(subscriber.websocket)
+        task = asyncio.create_task(self._close(subscriber.websocket))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            await asyncio.wait_for(
+                websocket.close(code=SLOW_CONSUMER_CLOSE_CODE),
+                SEND_TIMEOUT_SECONDS
+            )
+        except Exception:
+            pass
 
-        for ws in dead:
-            self.disconnect(ws)
+    async def _send_loop(self, subscriber: Subscriber):
+        try:
+            while True:
+                seq, message = await subscriber.queue.get()
+                if seq is not None and seq <= subscriber.after_seq:
+                    continue
+                await asyncio.wait_for(
+                    subscriber.websocket.send_text(message),
+                    SEND_TIMEOUT_SECONDS
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Send failed or timed out: the client is gone or too slow
+            self._drop(subscriber)
 
 # 🔴 SINGLE INSTANCE — NEVER CREATE AGAIN
 websocket_manager = WebSocketManager()
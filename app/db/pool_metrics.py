@@ -0,0 +1,80 @@
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine
+
+
+class PoolStats:
+    """Counters for connection checkouts, kept across pool recreation."""
+
+    # Checkouts faster than this came straight from the pool.
+    WAIT_THRESHOLD_SECONDS = 0.005
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.waited = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def record(self, elapsed: float, timed_out: bool = False):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_time_total += elapsed
+            self.wait_time_max = max(self.wait_time_max, elapsed)
+            if elapsed >= self.WAIT_THRESHOLD_SECONDS:
+                self.waited += 1
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "waited": self.waited,
+                "timeouts": self.timeouts,
+                "wait_time_total_ms": round(self.wait_time_total * 1000, 3),
+                "wait_time_avg_ms": round(self.wait_time_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_time_max_ms": round(self.wait_time_max * 1000, 3),
+            }
+
+
+def instrumented_pool(pool_class, stats: PoolStats):
+    """
+    Subclass a QueuePool flavour so every checkout is timed.
+
+    The time spent in _do_get covers waiting for a free connection and
+    opening an overflow one, which is what a request experiences.
+    """
+
+    class InstrumentedPool(pool_class):
+        pool_stats = stats
+
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                conn = super()._do_get()
+            except exc.TimeoutError:
+                self.pool_stats.record(time.perf_counter() - start, timed_out=True)
+                raise
+            self.pool_stats.record(time.perf_counter() - start)
+            return conn
+
+    InstrumentedPool.__name__ = f"Instrumented{pool_class.__name__}"
+    return InstrumentedPool
+
+
+def pool_status(engine: Engine) -> dict:
+    pool = engine.pool
+    status = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+    stats = getattr(pool, "pool_stats", None)
+    if stats is not None:
+        status.update(stats.snapshot())
+    return status
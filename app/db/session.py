@@ -1,10 +1,35 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.core.config import settings
+from app.db.pool_metrics import PoolStats, instrumented_pool
+
+sync_pool_stats = PoolStats()
+async_pool_stats = PoolStats()
+
+# Shared by both engines; each gunicorn worker gets its own pools.
+pool_options = dict(
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
 
 # SQLAlchemy engine (connects to PostgreSQL)
 db_url = settings.DATABASE_URL.replace("postgres://", "postgresql://")
-engine = create_engine(db_url, echo=False)
+engine = create_engine(
+    db_url,
+    echo=False,
+    poolclass=instrumented_pool(QueuePool, sync_pool_stats),
+    connect_args=(
+        {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+        if settings.DB_STATEMENT_TIMEOUT_MS else {}
+    ),
+    **pool_options
+)
 
 # Session Local class for DB sessions
 SessionLocal = sessionmaker(
@@ -14,6 +39,36 @@ SessionLocal = sessionmaker(
 )
 
 
+def _async_url(url: str):
+    """Same database, asyncpg driver. asyncpg spells libpq's sslmode as ssl."""
+    async_url = make_url(url).set(drivername="postgresql+asyncpg")
+    if "sslmode" in async_url.query:
+        sslmode = async_url.query["sslmode"]
+        async_url = async_url.difference_update_query(["sslmode"]).update_query_dict({"ssl": sslmode})
+    return async_url
+
+
+# Async engine for the endpoints that run on the event loop
+async_engine = create_async_engine(
+    _async_url(db_url),
+    echo=False,
+    poolclass=instrumented_pool(AsyncAdaptedQueuePool, async_pool_stats),
+    connect_args=(
+        {"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}}
+        if settings.DB_STATEMENT_TIMEOUT_MS else {}
+    ),
+    **pool_options
+)
+
+# expire_on_commit=False: lazy reloads after commit are not possible on an AsyncSession
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+
 # Dependency for FastAPI (we will use this in routes)
 def get_db():
     db = SessionLocal()
@@ -21,3 +76,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Async dependency for `async def` routes
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
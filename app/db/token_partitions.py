@@ -0,0 +1,138 @@
+"""
+Maintenance for the range-partitioned `tokens` table.
+
+Tokens are partitioned by month on token_date (tokens_pYYYY_MM) with a
+tokens_default partition catching anything outside the prepared range.
+Old months are detached and their rows moved to tokens_archive, so the
+hot endpoints only ever touch small, recent partitions.
+"""
+import logging
+import re
+from datetime import date
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "tokens"
+DEFAULT_PARTITION = "tokens_default"
+ARCHIVE_TABLE = "tokens_archive"
+
+_PARTITION_NAME = re.compile(r"^tokens_p(\d{4})_(\d{2})$")
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"tokens_p{month.year:04d}_{month.month:02d}"
+
+
+def list_partitions(conn: Connection) -> List[date]:
+    """Months that have their own partition, oldest first."""
+    rows = conn.execute(text(
+        """
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = :parent
+        """
+    ), {"parent": PARENT_TABLE}).scalars()
+
+    months = []
+    for name in rows:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+def create_partition(conn: Connection, month: date) -> bool:
+    """
+    Create the partition for `month` if missing. Rows that already landed in
+    the default partition for that month are moved into it first, otherwise
+    Postgres refuses to create the partition.
+    """
+    if month in list_partitions(conn):
+        return False
+
+    name = partition_name(month)
+    bounds = {"start": month, "end": add_months(month, 1)}
+
+    in_default = conn.execute(text(
+        f"SELECT count(*) FROM {DEFAULT_PARTITION} "
+        "WHERE token_date >= :start AND token_date < :end"
+    ), bounds).scalar()
+
+    if not in_default:
+        conn.execute(text(
+            f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} "
+            f"FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+        ))
+    else:
+        conn.execute(text(
+            f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        ))
+        conn.execute(text(
+            f"WITH moved AS ("
+            f"  DELETE FROM {DEFAULT_PARTITION} "
+            f"  WHERE token_date >= :start AND token_date < :end RETURNING *"
+            f") INSERT INTO {name} SELECT * FROM moved"
+        ), bounds)
+        conn.execute(text(
+            f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+        ))
+
+    logger.info(f"Created partition {name} ({in_default or 0} rows moved from default)")
+    return True
+
+
+def archive_partition(conn: Connection, month: date) -> int:
+    """Detach a month, copy its rows to tokens_archive and drop it."""
+    name = partition_name(month)
+
+    conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+    moved = conn.execute(text(
+        f"INSERT INTO {ARCHIVE_TABLE} SELECT * FROM {name} ON CONFLICT DO NOTHING"
+    )).rowcount
+    conn.execute(text(f"DROP TABLE {name}"))
+
+    logger.info(f"Archived partition {name} ({moved} rows)")
+    return moved
+
+
+def maintain_partitions(engine: Engine, today: date, months_ahead: int, retain_months: int):
+    """
+    Make sure partitions exist from the current month to `months_ahead`
+    months ahead, and archive every month older than `retain_months`.
+    Each step runs in its own transaction.
+    """
+    current = month_start(today)
+    created, archived = [], []
+
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        with engine.begin() as conn:
+            if create_partition(conn, month):
+                created.append(partition_name(month))
+
+    cutoff = add_months(current, -retain_months)
+    with engine.connect() as conn:
+        old_months = [month for month in list_partitions(conn) if month < cutoff]
+
+    for month in old_months:
+        with engine.begin() as conn:
+            archive_partition(conn, month)
+        archived.append(partition_name(month))
+
+    return created, archived
@@ -1,45 +1,72 @@
 import os
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.v1.routes import auth,admin,assistant
+from app.api.v1.routes import auth,admin,assistant,metrics
 from app.api.v1.controllers.patient_token import router as patient_token_router
 from app.api.v1.routes import websocket
 from datetime import datetime
 from app.db.session import SessionLocal
 from app.db.seed_roles import seed_roles
+from app.core.token_sequencer import reconcile_sequences
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.doctor_queue import reconcile_queues
+from app.core.permissions import compile_permissions, seed_permissions
 
-from app.core.redis import test_redis_connection
+from app.core.redis import redis_status, test_redis_connection
+from app.core.event_bus import start_event_bus, stop_event_bus
+from app.core.outbox import start_outbox_dispatcher, stop_outbox_dispatcher
+from app.core.queue_state import queue_state
+from app.core.token_revocation import load_revocations
 from app.core.exceptions import (
     global_exception_handler,
     hospital_api_exception_handler, 
     http_exception_handler,
     validation_exception_handler,
+    hasher_busy_exception_handler,
     HospitalAPIException
 )
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
+from app.utils.hashing import HasherBusy
 from app.assistant.service import AssistantService
 import app.assistant.state as assistant_state
 
-app = FastAPI(title="Hospital Token Management System")
+# orjson for every response that isn't already encoded
+app = FastAPI(title="Hospital Token Management System", default_response_class=ORJSONResponse)
 
 @app.on_event("startup")
 async def startup_event():
    test_redis_connection()
+   start_event_bus()
    
    assistant_state.assistant_service = AssistantService()
 
    db = SessionLocal()
    try:
        seed_roles(db)
+       seed_permissions(db)
+       compile_permissions(db)
+       reconcile_sequences(db)
+       reconcile_queues(db)
    finally:
        db.close()
+
+   await load_revocations()
+   await queue_state.ensure_current()
+   start_outbox_dispatcher()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+   await stop_outbox_dispatcher()
+   await stop_event_bus()
   
   
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.utcnow()}
+    return {"status": "healthy", "redis": await redis_status(), "timestamp": datetime.utcnow()}
 
 app.add_middleware(
     CORSMiddleware,
@@ -48,12 +75,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 app.add_exception_handler(Exception, global_exception_handler)
 app.add_exception_handler(HospitalAPIException, hospital_api_exception_handler)
 app.add_exception_handler(StarletteHTTPException, http_exception_handler)
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
+app.add_exception_handler(HasherBusy, hasher_busy_exception_handler)
 
 
 # Include routers
@@ -62,6 +91,7 @@ app.include_router(admin.router)
 app.include_router(assistant.router)
 app.include_router(patient_token_router)  # /patients and /tokens endpoints
 app.include_router(websocket.router)
+app.include_router(metrics.router)
 
 
 if __name__ == "__main__":
@@ -6,4 +6,6 @@ from .nurse import Nurse
 from .doctor import Doctor
 from .patient import Patient
 from .token import Token
-from .staff import Staff
\ No newline at end of file
+from .staff import Staff
+from .token_sequence import TokenSequence
+from .outbox_event import OutboxEvent
@@ -0,0 +1,16 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, Column, DateTime, String
+from sqlalchemy.dialects.postgresql import JSONB
+from app.db.base import Base
+
+class OutboxEvent(Base):
+    """
+    Event written in the same transaction as the change it describes and
+    delivered afterwards by the outbox dispatcher (app/core/outbox.py).
+    """
+    __tablename__ = "outbox_events"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    channel = Column(String(100), nullable=False)
+    payload = Column(JSONB, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -1,17 +1,54 @@
+import re
 import uuid
-from sqlalchemy import Column, String, Integer
+from typing import Optional
+from sqlalchemy import Column, Computed, Index, String, Integer, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
+
+# Python twins of the generated columns below; lookups must normalize the
+# same way Postgres does.
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    return (email or "").strip().lower() or None
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    return re.sub(r"\D", "", phone or "") or None
+
+
 class Patient(Base):
     __tablename__ = "patients"
+    __table_args__ = (
+        # One patient per email / phone; text_pattern_ops also serves the
+        # prefix (LIKE 'abc%') searches at the front desk
+        Index(
+            "ux_patients_email_normalized", "email_normalized",
+            unique=True,
+            postgresql_ops={"email_normalized": "text_pattern_ops"},
+            postgresql_where=text("email_normalized IS NOT NULL"),
+        ),
+        Index(
+            "ux_patients_phone_normalized", "phone_normalized",
+            unique=True,
+            postgresql_ops={"phone_normalized": "text_pattern_ops"},
+            postgresql_where=text("phone_normalized IS NOT NULL"),
+        ),
+        # Substring / typo-tolerant name search (pg_trgm)
+        Index(
+            "ix_patients_name_trgm", "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String, nullable=False)
     email = Column(String, nullable=True)
     phone = Column(String, nullable=True)
     age = Column(Integer, nullable=False)
+    # Maintained by Postgres: "  John@X.com" -> "john@x.com", "+91 98-76" -> "919876"
+    email_normalized = Column(String, Computed("NULLIF(lower(btrim(email)), '')", persisted=True))
+    phone_normalized = Column(String, Computed("NULLIF(regexp_replace(phone, '\\D', '', 'g'), '')", persisted=True))
 
     tokens = relationship("Token", back_populates="patient")
-    
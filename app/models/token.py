@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, String, ForeignKey, DateTime, Date, Enum, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from app.db.base import Base
@@ -11,8 +11,29 @@ class TokenStatus(str, enum.Enum):
     in_progress = "in_progress"
     completed = "completed"
 
+def utc_today():
+    return datetime.utcnow().date()
+
 class Token(Base):
     __tablename__ = "tokens"
+    __table_args__ = (
+        # Doctor dashboard, sequencer floor: one doctor, one day, in order
+        Index("ix_tokens_doctor_id_token_date_created_at", "doctor_id", "token_date", "created_at"),
+        # Staff "today" list and status counts
+        Index("ix_tokens_token_date_status", "token_date", "status"),
+        # Public display: only tokens still in the queue
+        Index(
+            "ix_tokens_active_token_date_created_at", "token_date", "created_at",
+            postgresql_where=text("status <> 'completed'"),
+        ),
+        # A token number is issued once per doctor and day
+        Index(
+            "ux_tokens_doctor_id_token_date_token_number", "doctor_id", "token_date", "token_number",
+            unique=True,
+        ),
+        # Monthly partitions, see app/db/token_partitions.py
+        {"postgresql_partition_by": "RANGE (token_date)"},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     token_number = Column(String, nullable=False)
@@ -20,6 +41,12 @@ class Token(Base):
     doctor_id = Column(UUID(as_uuid=True), ForeignKey("doctors.id"), nullable=False)
     status = Column(Enum(TokenStatus), default=TokenStatus.waiting)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # UTC day the token was issued for; token numbers restart every day.
+    # Partition key, so it is part of the primary key.
+    token_date = Column(
+        Date, primary_key=True, nullable=False, default=utc_today,
+        server_default=text("(now() AT TIME ZONE 'utc')::date"),
+    )
 
     patient = relationship("Patient", back_populates="tokens")
     doctor = relationship("Doctor", back_populates="tokens")
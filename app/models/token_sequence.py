@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Date, Integer, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from app.db.base import Base
+
+class TokenSequence(Base):
+    """Durable per-doctor, per-day token counter (fallback for the Redis sequencer)."""
+    __tablename__ = "token_sequences"
+
+    doctor_id = Column(UUID(as_uuid=True), ForeignKey("doctors.id", ondelete="CASCADE"), primary_key=True)
+    seq_date = Column(Date, primary_key=True)
+    # Highest number reserved on either path; Redis leases blocks ahead of use
+    last_number = Column(Integer, nullable=False, default=0)
+    # Highest number issued by the database fallback
+    fallback_number = Column(Integer, nullable=False, default=0, server_default="0")
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Boolean, DateTime
+from sqlalchemy import Column, String, Boolean, DateTime, Integer
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -16,6 +16,8 @@ class User(Base):
   phone = Column(String(32), nullable=True, index=True)
   hashed_password = Column(String, nullable=False)
   is_active = Column(Boolean, default=True, nullable=False)
+  # Bumped on role change / deactivation; older access tokens are rejected
+  token_version = Column(Integer, default=0, server_default="0", nullable=False)
   created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
   updated_at = Column(DateTime, default=datetime.utcnow, 
   onupdate=datetime.utcnow, nullable=False)
@@ -25,7 +27,9 @@ class User(Base):
     "Role",
     secondary=user_roles_table,
     back_populates="users",
-    lazy="subquery"  
+    # One extra IN query per batch of users; listings select role names
+    # directly (see user_page) and async paths use selectinload explicitly
+    lazy="selectin"
 )
   doctor_profile = relationship("Doctor", back_populates="user", uselist=False)
   nurse_profile = relationship("Nurse", back_populates="user", uselist=False)
@@ -1,7 +1,29 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
 from argon2 import PasswordHasher
-from argon2.exceptions import VerifyMismatchError
+from argon2.exceptions import InvalidHashError, VerifyMismatchError
+
+from app.core.config import settings
+
+ph = PasswordHasher(
+    time_cost=settings.ARGON2_TIME_COST,
+    memory_cost=settings.ARGON2_MEMORY_COST,
+    parallelism=settings.ARGON2_PARALLELISM,
+)
+
+# Hashing gets its own threads so a login burst can't use up the AnyIO
+# threadpool that every sync endpoint shares.
+_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="argon2",
+)
+# Calls running or queued on _executor (only touched from the event loop)
+_pending = 0
 
-ph = PasswordHasher()
+
+class HasherBusy(Exception):
+    """The hashing pool and its queue are full; the caller should retry shortly."""
 
 
 def hash_password(password: str) -> str:
@@ -14,5 +36,32 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     try:
         ph.verify(hashed_password, plain_password)
         return True
-    except VerifyMismatchError:
+    except (VerifyMismatchError, InvalidHashError):
+        return False
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True when the hash was made with other Argon2 parameters than the current ones."""
+    try:
+        return ph.check_needs_rehash(hashed_password)
+    except InvalidHashError:
         return False
+
+
+async def _run_bounded(fn, *args):
+    global _pending
+    if _pending >= settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_MAX_PENDING:
+        raise HasherBusy()
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_bounded(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_bounded(verify_password, plain_password, hashed_password)
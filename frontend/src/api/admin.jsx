@@ -1,7 +1,7 @@
-import api from "./axios";
+import api, { getAllPages } from "./axios";
 
 export const fetchEmployees = () => {
-  return api.get("/admin/employees");
+  return getAllPages("/admin/employees");
 };
 
 export const createDoctor = (data) => {
@@ -1,9 +1,9 @@
-import api from "./axios";
+import api, { getAllPages } from "./axios";
 
 export const createUser = (data) => {
   return api.post("/auth/create", data);
 };
 
 export const fetchUsers = () => {
-  return api.get("/auth/users");
+  return getAllPages("/auth/users");
 };
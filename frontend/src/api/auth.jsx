@@ -6,4 +6,12 @@ export const fetchMe = () => {
       Authorization: `Bearer ${localStorage.getItem("access_token")}`,
     },
   });
-};
\ No newline at end of file
+};
+
+export const logout = () => {
+  const refreshToken = localStorage.getItem("refresh_token");
+  if (!refreshToken) {
+    return Promise.resolve();
+  }
+  return api.post("/auth/logout", { refresh_token: refreshToken });
+};
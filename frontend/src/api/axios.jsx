@@ -17,4 +17,17 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
+// List endpoints are paged (X-Next-Cursor header); screens that show a
+// whole list follow the cursor with the largest page size
+export const getAllPages = async (url, params = {}) => {
+  let data = [];
+  let cursor;
+  do {
+    const res = await api.get(url, { params: { ...params, limit: 1000, cursor } });
+    data = data.concat(res.data);
+    cursor = res.headers["x-next-cursor"];
+  } while (cursor);
+  return { data };
+};
+
 export default api
\ No newline at end of file
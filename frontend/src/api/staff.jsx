@@ -1,13 +1,38 @@
-import api from "./axios";
+import api, { getAllPages } from "./axios";
+
+const MAX_ATTEMPTS = 3;
+
+// POST that is safe to retry: every attempt carries the same Idempotency-Key,
+// so a request that reached the server but lost its response is answered
+// from the stored result instead of being executed twice.
+const idempotentPost = async (url, payload) => {
+  const headers = { "Idempotency-Key": crypto.randomUUID() };
+  for (let attempt = 1; ; attempt++) {
+    try {
+      return await api.post(url, payload, { headers });
+    } catch (err) {
+      // Retry only when no response arrived (network drop, timeout)
+      // or the first attempt is still being processed
+      const retryable = !err.response || err.response.status === 409;
+      if (!retryable || attempt >= MAX_ATTEMPTS) throw err;
+      await new Promise((resolve) => setTimeout(resolve, 500 * attempt));
+    }
+  }
+};
 
 // 1️⃣ Register patient
 export const createPatient = (payload) => {
-  return api.post("/patients", payload);
+  return idempotentPost("/patients", payload);
 };
 
 // 2️⃣ List all patients
 export const fetchPatients = () => {
-  return api.get("/patients");
+  return getAllPages("/patients");
+};
+
+// Find returning patients by name, phone or email prefix
+export const searchPatients = (q) => {
+  return api.get("/patients/search", { params: { q } });
 };
 
 // 3️⃣ List doctors (staff-safe)
@@ -17,11 +42,11 @@ export const fetchDoctors = () => {
 
 // 4️⃣ Generate token
 export const createToken = (payload) => {
-  return api.post("/patients/token", payload);
+  return idempotentPost("/patients/token", payload);
 };
 
 // 5️⃣ Today tokens
 export const fetchTodayTokens = () => {
   const token = localStorage.getItem("access_token");
-  return api.get("/patients/tokens/today");
+  return getAllPages("/patients/tokens/today");
 };
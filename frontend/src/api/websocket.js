@@ -1,10 +1,28 @@
 let socket = null;
 let listeners = [];
+let options = { snapshot: false, topics: [] };
+let lastSeq = null;
+let reconnectTimer = null;
 
-export const connectWebSocket = () => {
+const RECONNECT_DELAY_MS = 2000;
+
+const buildUrl = () => {
+  const params = new URLSearchParams();
+  if (options.topics.length) params.set("topics", options.topics.join(","));
+  // Resume from the last seen event, or ask for a fresh snapshot
+  if (options.snapshot) {
+    if (lastSeq !== null) params.set("since", lastSeq);
+    else params.set("snapshot", "1");
+  }
+  const query = params.toString();
+  return `ws://127.0.0.1:8000/ws/tokens${query ? `?${query}` : ""}`;
+};
+
+export const connectWebSocket = (opts = {}) => {
+  options = { ...options, ...opts };
   if (socket) return;
 
-  socket = new WebSocket("ws://127.0.0.1:8000/ws/tokens");
+  socket = new WebSocket(buildUrl());
 
   socket.onopen = () => {
     console.log("WebSocket connected");
@@ -13,6 +31,10 @@ export const connectWebSocket = () => {
   socket.onmessage = (event) => {
     try {
       const data = JSON.parse(event.data);
+      if (typeof data.seq === "number") {
+        // A snapshot replaces our state, including the seq we resume from
+        lastSeq = lastSeq === null || data.event === "SNAPSHOT" ? data.seq : Math.max(lastSeq, data.seq);
+      }
       listeners.forEach((cb) => cb(data));
     } catch (e) {
       console.error("WebSocket parse error", e);
@@ -22,6 +44,12 @@ export const connectWebSocket = () => {
   socket.onclose = () => {
     socket = null;
     console.log("WebSocket disconnected");
+    if (listeners.length && !reconnectTimer) {
+      reconnectTimer = setTimeout(() => {
+        reconnectTimer = null;
+        connectWebSocket();
+      }, RECONNECT_DELAY_MS);
+    }
   };
 
   socket.onerror = (e) => {
@@ -18,6 +18,7 @@ import {
 } from "../api/admin";
 
 import { createUser } from "../api/adminUsers";
+import { logout } from "../api/auth";
 
 /* ================= UI HELPERS (STYLE ONLY) ================= */
 const card = "bg-white rounded-xl border border-slate-200 shadow-sm";
@@ -229,7 +230,12 @@ export default function AdminDashboard() {
     }
   };
 
-  const handleLogout = () => {
+  const handleLogout = async () => {
+    try {
+      await logout();
+    } catch {
+      // Session may already be gone; clear locally either way
+    }
     localStorage.clear();
     navigate("/");
   };
@@ -45,6 +45,7 @@ export default function DoctorDashboard() {
     const onMessage = (data) => {
       if (
         data.event === "TOKEN_CREATED" ||
+        data.event === "TOKENS_CREATED" ||
         data.event === "TOKEN_STATUS_UPDATED"
       ) {
         loadTokens();
@@ -1,7 +1,7 @@
 import { useEffect, useState } from "react";
 import {
   createPatient,
-  fetchPatients,
+  searchPatients,
   fetchDoctors,
   createToken,
   fetchTodayTokens,
@@ -26,6 +26,7 @@ export default function StaffDashboard() {
     phone: "",
   });
 
+  const [patientQuery, setPatientQuery] = useState("");
   const [selectedPatient, setSelectedPatient] = useState("");
   const [selectedDoctor, setSelectedDoctor] = useState("");
 
@@ -39,6 +40,7 @@ export default function StaffDashboard() {
     const onMessage = (data) => {
      if (
     data.event === "TOKEN_CREATED" ||
+    data.event === "TOKENS_CREATED" ||
     data.event === "TOKEN_STATUS_UPDATED"
   ) {
     loadAll();
@@ -52,15 +54,31 @@ export default function StaffDashboard() {
     };
   }, []);
 
+  // Returning patients: search as you type instead of loading every patient
+  useEffect(() => {
+    const query = patientQuery.trim();
+    if (query.length < 2) {
+      setPatients([]);
+      return;
+    }
+    const timer = setTimeout(async () => {
+      try {
+        const res = await searchPatients(query);
+        setPatients(res.data);
+      } catch (err) {
+        console.error(err);
+      }
+    }, 200);
+    return () => clearTimeout(timer);
+  }, [patientQuery]);
+
   const loadAll = async () => {
     try {
-      const [p, d, t] = await Promise.all([
-        fetchPatients(),
+      const [d, t] = await Promise.all([
         fetchDoctors(),
         fetchTodayTokens(),
       ]);
 
-      setPatients(p.data);
       setDoctors(d.data);
       setTokens(t.data);
     } catch (err) {
@@ -188,6 +206,13 @@ export default function StaffDashboard() {
               Generate Token
             </h2>
 
+            <input
+              value={patientQuery}
+              onChange={(e) => setPatientQuery(e.target.value)}
+              placeholder="Search patient by name, phone or email"
+              className="border border-slate-300 rounded-lg px-4 py-2 w-full focus:outline-none focus:ring-2 focus:ring-emerald-500"
+            />
+
             <select
               value={selectedPatient}
               onChange={(e) => setSelectedPatient(e.target.value)}
@@ -196,7 +221,7 @@ export default function StaffDashboard() {
               <option value="">Select Patient</option>
               {patients.map((p) => (
                 <option key={p.id} value={p.id}>
-                  {p.name}
+                  {p.name}{p.phone ? ` — ${p.phone}` : ""}
                 </option>
               ))}
             </select>
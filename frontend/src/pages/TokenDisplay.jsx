@@ -5,34 +5,32 @@ import {
   removeWebSocketListener,
 } from "../api/websocket";
 
-import { fetchPublicTodayTokens } from "../api/public";
+const TOKEN_EVENTS = ["TOKEN_CREATED", "TOKEN_STATUS_UPDATED"];
+
+// Insert or replace a token row; completed tokens leave the display
+const applyTokenDelta = (tokens, token) => {
+  const rest = tokens.filter((t) => t.id !== token.id);
+  if (token.status === "completed") return rest;
+  return [...rest, token].sort(
+    (a, b) => new Date(a.created_at) - new Date(b.created_at)
+  );
+};
 
 export default function TokenDisplay() {
   const [tokens, setTokens] = useState([]);
 
   useEffect(() => {
-    // 1️⃣ Initial fetch
-    fetchPublicTodayTokens()
-      .then((res) => {
-        setTokens(res.data.filter(t => t.status !== "completed"));
-      })
-      .catch(console.error);
-
-    // 2️⃣ Connect WebSocket
-    connectWebSocket();
+    // Server sends a SNAPSHOT first, then only deltas (resumes on reconnect)
+    connectWebSocket({ snapshot: true });
 
     const onMessage = (data) => {
-      console.log("WS EVENT:", data);
-
-      if (
-        data.event === "TOKEN_CREATED" ||
-        data.event === "TOKEN_STATUS_UPDATED"
-      ) {
-        fetchPublicTodayTokens()
-          .then((res) => {
-            setTokens(res.data.filter(t => t.status !== "completed"));
-          })
-          .catch(console.error);
+      if (data.event === "SNAPSHOT") {
+        setTokens(data.tokens);
+      } else if (TOKEN_EVENTS.includes(data.event) && data.token) {
+        setTokens((prev) => applyTokenDelta(prev, data.token));
+      } else if (data.event === "TOKENS_CREATED" && data.tokens) {
+        // Bulk issuance: one event carries the whole batch
+        setTokens((prev) => data.tokens.reduce(applyTokenDelta, prev));
       }
     };
 
@@ -0,0 +1,61 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.core.config import settings
+from app.utils.hashing import hash_password, verify_password
+
+# Measures Argon2 verifications per second with the configured cost, e.g.:
+#   python scripts/bench_password_hashing.py --seconds 5
+#   ARGON2_MEMORY_COST=19456 ARGON2_TIME_COST=2 python scripts/bench_password_hashing.py
+#
+# Use the result to pick PASSWORD_HASH_WORKERS: throughput stops improving
+# once the threads outnumber the cores you want to give to logins.
+
+def run(threads: int, seconds: float, hashed: str) -> float:
+  deadline = time.perf_counter() + seconds
+
+  def worker():
+    count = 0
+    while time.perf_counter() < deadline:
+      verify_password("bench-password", hashed)
+      count += 1
+    return count
+
+  started = time.perf_counter()
+  with ThreadPoolExecutor(max_workers=threads) as pool:
+    total = sum(f.result() for f in [pool.submit(worker) for _ in range(threads)])
+  return total / (time.perf_counter() - started)
+
+
+def main():
+  cores = os.cpu_count() or 1
+  parser = argparse.ArgumentParser(description="Benchmark Argon2 login verification throughput.")
+  parser.add_argument("--seconds", type=float, default=3.0, help="duration of each run")
+  parser.add_argument("--max-threads", type=int, default=cores, help="highest thread count to try")
+  args = parser.parse_args()
+
+  print(
+    f"Argon2 time_cost={settings.ARGON2_TIME_COST} "
+    f"memory_cost={settings.ARGON2_MEMORY_COST}KiB "
+    f"parallelism={settings.ARGON2_PARALLELISM}, {cores} cores"
+  )
+  hashed = hash_password("bench-password")
+
+  threads = 1
+  while threads <= args.max_threads:
+    rate = run(threads, args.seconds, hashed)
+    per_core = rate / min(threads, cores)
+    print(f"{threads:>3} threads: {rate:8.1f} logins/sec ({per_core:.1f} per core)")
+    threads *= 2
+
+if __name__ == "__main__":
+  main()
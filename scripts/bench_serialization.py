@@ -0,0 +1,105 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from app.api.v1.schemas.patient_token import TokenRead
+from app.core.queue_state import token_rows
+from app.core.serialization import TOKEN_LIST_ADAPTER, json_array
+from app.models.patient import Patient
+from app.models.token import Token, TokenStatus
+
+# Compares the ways a list of tokens can become a response body, e.g.:
+#   python scripts/bench_serialization.py --tokens 10000 --repeat 20
+#
+# No database needed: the tokens are built in memory.
+
+def make_tokens(count: int):
+  started = datetime.utcnow()
+  patients = [
+    Patient(id=uuid.uuid4(), name=f"Patient {i}", email=f"patient{i}@example.com", phone=f"98765{i:05d}", age=30)
+    for i in range(count // 4 or 1)
+  ]
+  doctors = [uuid.uuid4() for _ in range(20)]
+  return [
+    Token(
+      id=uuid.uuid4(),
+      token_number=str(i + 1),
+      patient=patients[i % len(patients)],
+      patient_id=patients[i % len(patients)].id,
+      doctor_id=doctors[i % len(doctors)],
+      status=TokenStatus.waiting,
+      created_at=started + timedelta(milliseconds=i),
+    )
+    for i in range(count)
+  ]
+
+
+def measure(repeat: int, fn) -> float:
+  """Best of `repeat` runs, in milliseconds."""
+  best = float("inf")
+  for _ in range(repeat):
+    started = time.perf_counter()
+    fn()
+    best = min(best, time.perf_counter() - started)
+  return best * 1000
+
+
+def main():
+  parser = argparse.ArgumentParser(description="Benchmark token list serialization.")
+  parser.add_argument("--tokens", type=int, default=10000, help="tokens per list")
+  parser.add_argument("--repeat", type=int, default=10, help="runs per case (best is reported)")
+  args = parser.parse_args()
+
+  tokens = make_tokens(args.tokens)
+  rows = token_rows(tokens)
+  encoded = [orjson.dumps(row) for row in rows]
+  event = {"event": "TOKENS_CREATED", "seq": 1, "tokens": rows}
+
+  # Each group's first case is the old path the others are compared with
+  groups = [
+    ("ORM objects -> JSON body", [
+      ("per-row model_validate + jsonable_encoder + json.dumps", lambda: json.dumps(
+        jsonable_encoder([TokenRead.model_validate(token) for token in tokens])
+      )),
+      ("TypeAdapter validate + dump_json", lambda: TOKEN_LIST_ADAPTER.dump_json(
+        TOKEN_LIST_ADAPTER.validate_python(tokens)
+      )),
+    ]),
+    ("queue state rows -> JSON body", [
+      ("response_model re-validation + json.dumps", lambda: json.dumps(
+        jsonable_encoder([TokenRead.model_validate(row) for row in rows])
+      )),
+      ("json.dumps", lambda: json.dumps(rows)),
+      ("orjson.dumps", lambda: orjson.dumps(rows)),
+      ("join of cached encodings", lambda: json_array(encoded)),
+    ]),
+    ("one WebSocket event with every row", [
+      ("json.dumps", lambda: json.dumps(event)),
+      ("orjson.dumps", lambda: orjson.dumps(event).decode()),
+    ]),
+  ]
+
+  print(f"{args.tokens} tokens, best of {args.repeat} runs")
+  for title, cases in groups:
+    print(f"\n{title}")
+    baseline = None
+    for name, fn in cases:
+      ms = measure(args.repeat, fn)
+      baseline = baseline or ms
+      print(f"  {name:<56} {ms:9.2f} ms  ({baseline / ms:6.1f}x)")
+
+if __name__ == "__main__":
+  main()
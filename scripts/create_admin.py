@@ -5,20 +5,18 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import asyncio
 from dotenv import load_dotenv
-from argon2 import PasswordHasher
 
 from app.db.session import SessionLocal
 from app.models.user import User
 from app.models.role import Role
 from app.models.user_role import user_roles_table
 from app.core.config import settings
+from app.utils.hashing import hash_password
 
 load_dotenv()
 ADMIN_EMAIL=settings.ADMIN_EMAIL
 ADMIN_PASSWORD=settings.ADMIN_PASSWORD
 
-ph = PasswordHasher()
-
 def create_admin():
   db = SessionLocal()
 
@@ -35,7 +33,7 @@ def create_admin():
       db.commit()
       db.refresh(admin_role)
 
-    hashed_password = ph.hash(ADMIN_PASSWORD)
+    hashed_password = hash_password(ADMIN_PASSWORD)
     admin_user = User(
       email=ADMIN_EMAIL,
       hashed_password=hashed_password,
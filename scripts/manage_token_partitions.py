@@ -0,0 +1,38 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+from datetime import datetime
+from dotenv import load_dotenv
+
+from app.db.session import engine
+from app.db.token_partitions import maintain_partitions
+
+load_dotenv()
+
+# Run daily (cron / scheduler), e.g.:
+#   python scripts/manage_token_partitions.py --months-ahead 2 --retain-months 3
+
+def main():
+  parser = argparse.ArgumentParser(description="Create future token partitions and archive old ones.")
+  parser.add_argument("--months-ahead", type=int, default=2, help="partitions to prepare after the current month")
+  parser.add_argument("--retain-months", type=int, default=3, help="full months kept in the hot tokens table")
+  args = parser.parse_args()
+
+  try:
+    created, archived = maintain_partitions(
+      engine,
+      today=datetime.utcnow().date(),
+      months_ahead=args.months_ahead,
+      retain_months=args.retain_months,
+    )
+    print("Created partitions:", ", ".join(created) or "none")
+    print("Archived partitions:", ", ".join(archived) or "none")
+  except Exception as e:
+    print("Error:", e)
+    sys.exit(1)
+
+if __name__ == "__main__":
+  main()
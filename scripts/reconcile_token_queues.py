@@ -0,0 +1,37 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+from datetime import date
+from dotenv import load_dotenv
+
+from app.db.session import SessionLocal
+from app.core.doctor_queue import reconcile_queues
+from app.models.token import utc_today
+
+load_dotenv()
+
+# Repairs the Redis doctor queues from Postgres. Runs on startup; schedule it
+# too (e.g. every few minutes) if Redis restarts or evicts keys:
+#   python scripts/reconcile_token_queues.py
+#   python scripts/reconcile_token_queues.py --day 2026-01-15
+
+def main():
+  parser = argparse.ArgumentParser(description="Rebuild Redis doctor queues from Postgres.")
+  parser.add_argument("--day", type=date.fromisoformat, default=None, help="UTC day to reconcile (default: today)")
+  args = parser.parse_args()
+
+  db = SessionLocal()
+  try:
+    count = reconcile_queues(db, args.day or utc_today())
+    print(f"Reconciled {count} tokens")
+  except Exception as e:
+    print("Error:", e)
+    sys.exit(1)
+  finally:
+    db.close()
+
+if __name__ == "__main__":
+  main()